@@ -0,0 +1,145 @@
+import threading
+
+from nx.viper.controller import Controller as ViperController
+
+
+class Controller(ViperController):
+    """
+    Controller base class.
+
+    Models and services listed in the dependencies class attribute are resolved once, when the controller handles
+    its first request, and set as class attributes:
+
+        dependencies = {
+            "articleModel": ("model", "default.article"),
+            "nestedService": ("service", "default.nestedService")
+        }
+
+    When controller pooling is enabled instances are reused across requests, a controller must not be used once its
+    final response is sent.
+    """
+    dependencies = {}
+
+    def __init__(self, application, requestProtocol, requestVersion, requestParameters):
+        self.application = application
+        self._pool = None
+        self.setRequest(requestProtocol, requestVersion, requestParameters)
+
+    def setRequest(self, requestProtocol, requestVersion, requestParameters):
+        """
+        Reset the per-request state.
+
+        :param requestProtocol: <AbstractApplicationInterfaceProtocol> request protocol
+        :param requestVersion: <float> request version
+        :param requestParameters: <dict> request parameters
+        :return: <void>
+        """
+        self.requestProtocol = requestProtocol
+        self.requestVersion = requestVersion
+        self.requestParameters = requestParameters
+
+        self.responseCode = 0
+        self.responseContent = {}
+        self.responseErrors = []
+
+        # released once both the dispatch and the final response completed
+        self._pendingReleaseCount = 2
+
+    @classmethod
+    def resolveDependencies(cls, application):
+        """
+        Resolve the models and services the controller depends on.
+
+        :param application: <nx.viper.application.Application>
+        :return: <void>
+        """
+        for attributeName, (dependencyType, identifier) in cls.dependencies.items():
+            if dependencyType == "model":
+                dependency = application.getModel(identifier)
+            elif dependencyType == "service":
+                dependency = application.getService(identifier)
+            else:
+                raise ValueError("[Controller]: Unknown dependency type {} for {}.".format(dependencyType, identifier))
+
+            setattr(cls, attributeName, dependency)
+
+    def _releaseStep(self):
+        """
+        Return the controller to its pool once both the dispatch and the final response completed.
+
+        :return: <void>
+        """
+        if self._pool is not None:
+            self._pool.releaseStep(self)
+
+    def dispatchCompleted(self):
+        """
+        Method called by the dispatcher after postDispatch().
+
+        :return: <void>
+        """
+        self._releaseStep()
+
+    def sendFinalResponse(self):
+        super(Controller, self).sendFinalResponse()
+        self._releaseStep()
+
+
+class ControllerPool:
+    """
+    Pool of reusable controller instances of a controller class.
+    """
+
+    def __init__(self, controllerClass, application, maximumSize):
+        """
+        :param controllerClass: <class> Controller subclass
+        :param application: <nx.viper.application.Application>
+        :param maximumSize: <int> maximum number of idle instances kept
+        """
+        self.controllerClass = controllerClass
+        self.application = application
+        self.maximumSize = maximumSize
+
+        self._instances = []
+        self._lock = threading.Lock()
+
+    def acquire(self, requestProtocol, requestVersion, requestParameters):
+        """
+        Return an idle controller set up for the request, creating one if none is available.
+
+        :return: <Controller>
+        """
+        # list.pop() is atomic, the lock only guards the release steps
+        try:
+            controller = self._instances.pop()
+        except IndexError:
+            controller = self.controllerClass(self.application, requestProtocol, requestVersion, requestParameters)
+        else:
+            controller.setRequest(requestProtocol, requestVersion, requestParameters)
+
+        controller._pool = self
+        return controller
+
+    def releaseStep(self, controller):
+        """
+        Count a completed step of the controller's request and keep it for reuse once all steps completed.
+
+        :param controller: <Controller>
+        :return: <void>
+        """
+        with self._lock:
+            controller._pendingReleaseCount -= 1
+            if controller._pendingReleaseCount != 0:
+                return
+
+            # not keeping references to the completed request
+            controller.requestProtocol = None
+            controller.requestParameters = None
+            controller.responseContent = None
+            controller.responseErrors = None
+
+            if len(self._instances) < self.maximumSize:
+                self._instances.append(controller)
+
+    def __len__(self):
+        return len(self._instances)
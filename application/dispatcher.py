@@ -0,0 +1,201 @@
+import os
+import threading
+import importlib.util
+
+from nx.viper.dispatcher import Dispatcher as ViperDispatcher
+
+from application.controller import Controller, ControllerPool
+from application.validation import compileControllerSchema
+
+
+class Dispatcher(ViperDispatcher):
+    """
+    Dispatcher with controller caching and parameter validation.
+
+    The controllers of the loaded modules are imported and their parameter schemas compiled when the dispatcher is
+    created, so an invalid schema fails the startup. Their dependencies are resolved when they handle their first
+    request, lazily loaded models and services being loaded at that time. Requests failing validation are rejected
+    before the controller is instantiated. If performance.controllerPoolSize is greater than 0, instances of
+    controllers extending application.controller.Controller are reused across requests.
+    """
+
+    def __init__(self, application):
+        super(Dispatcher, self).__init__(application)
+
+        self._controllers = {}
+        self._resolvedControllers = set()
+        self._controllersLock = threading.Lock()
+
+        self._loadControllers()
+
+    def _loadControllers(self):
+        """
+        Import the controllers of the loaded modules.
+
+        :return: <void>
+        """
+        modulesPath = os.path.join("application", "module")
+        for moduleName in sorted(os.listdir(modulesPath)):
+            controllersPath = os.path.join(modulesPath, moduleName, "controller")
+            if not self.application.isModuleLoaded(moduleName) or not os.path.isdir(controllersPath):
+                continue
+
+            for controllerFile in sorted(os.listdir(controllersPath)):
+                if controllerFile.endswith(".py"):
+                    self._loadController(moduleName, controllerFile[:-len(".py")])
+
+    def _getController(self, moduleName, controllerName):
+        """
+        Return a controller class with its compiled parameter validators and pool, resolving its dependencies on
+        first use.
+
+        :param moduleName: <str> module name
+        :param controllerName: <str> controller name
+        :return: <tuple> controller class, validators by action name and controller pool (None if not pooled), None if
+                 the controller does not exist
+        """
+        controllerKey = (moduleName, controllerName)
+        controller = self._controllers.get(controllerKey)
+        if controller is None:
+            controller = self._loadController(moduleName, controllerName)
+            if controller is None:
+                return None
+
+        if controllerKey not in self._resolvedControllers:
+            with self._controllersLock:
+                if controllerKey not in self._resolvedControllers:
+                    if issubclass(controller[0], Controller):
+                        controller[0].resolveDependencies(self.application)
+                    self._resolvedControllers.add(controllerKey)
+
+        return controller
+
+    def _loadController(self, moduleName, controllerName):
+        """
+        Import a controller and compile its parameter validators, unless already imported.
+
+        :param moduleName: <str> module name
+        :param controllerName: <str> controller name
+        :return: <tuple> controller class, validators by action name and controller pool (None if not pooled), None if
+                 the controller does not exist
+        """
+        controllerKey = (moduleName, controllerName)
+        controller = self._controllers.get(controllerKey)
+        if controller is not None:
+            return controller
+
+        controllerPath = os.path.join(
+            "application",
+            "module",
+            moduleName,
+            "controller",
+            "{}.py".format(controllerName)
+        )
+        if not os.path.isfile(controllerPath):
+            return None
+
+        with self._controllersLock:
+            controller = self._controllers.get(controllerKey)
+            if controller is not None:
+                return controller
+
+            # importing controller
+            controllerSpec = importlib.util.spec_from_file_location(
+                controllerName,
+                controllerPath
+            )
+            controllerModule = importlib.util.module_from_spec(controllerSpec)
+            controllerSpec.loader.exec_module(controllerModule)
+
+            controllerClass = controllerModule.Controller
+            controllerPool = None
+            if issubclass(controllerClass, Controller):
+                controllerPoolSize = self.application.config["performance"].get("controllerPoolSize", 0)
+                if controllerPoolSize > 0:
+                    controllerPool = ControllerPool(controllerClass, self.application, controllerPoolSize)
+
+            controller = (
+                controllerClass,
+                compileControllerSchema(controllerClass),
+                controllerPool
+            )
+            self._controllers[controllerKey] = controller
+
+        return controller
+
+    def dispatch(self, requestProtocol, requestPayload):
+        """
+        Dispatch the request to the appropriate handler.
+
+        :param requestProtocol: <AbstractApplicationInterfaceProtocol> request protocol
+        :param requestPayload: <dict> request
+            :param version: <float> version
+            :param method: <str> method name
+            :param parameters: <dict> data parameters
+        :return: <void>
+        """
+        # method decoding
+        method = requestPayload["method"].split(".")
+        if len(method) != 3:
+            requestProtocol.failRequestWithErrors(["InvalidMethod"])
+            return
+
+        # parsing method name
+        methodModule = method[0]
+        methodController = method[1]
+        methodAction = method[2]
+
+        # checking if module exists
+        if not self.application.isModuleLoaded(methodModule):
+            requestProtocol.failRequestWithErrors(["InvalidMethodModule"])
+            return
+
+        # checking if controller exists
+        controller = self._getController(methodModule, methodController)
+        if controller is None:
+            requestProtocol.failRequestWithErrors(["InvalidMethodController"])
+            return
+
+        controllerClass, validators, controllerPool = controller
+
+        # checking if action exists
+        if not callable(getattr(controllerClass, "{}Action".format(methodAction), None)):
+            requestProtocol.failRequestWithErrors(["InvalidMethodAction"])
+            return
+
+        # validating parameters
+        validator = validators.get(methodAction)
+        if validator is not None:
+            if not isinstance(requestPayload["parameters"], dict):
+                requestProtocol.failRequestWithErrors(["InvalidParametersFormat"])
+                return
+
+            errors = validator(requestPayload["parameters"])
+            if len(errors) > 0:
+                requestProtocol.failRequestWithErrors(errors)
+                return
+
+        # instancing controller
+        if controllerPool is not None:
+            controllerInstance = controllerPool.acquire(
+                requestProtocol,
+                requestPayload["version"],
+                requestPayload["parameters"]
+            )
+        else:
+            controllerInstance = controllerClass(
+                self.application,
+                requestProtocol,
+                requestPayload["version"],
+                requestPayload["parameters"]
+            )
+
+        # executing action
+        requestProtocol.requestPassedDispatcherValidation()
+
+        controllerInstance.preDispatch()
+        getattr(controllerInstance, "{}Action".format(methodAction))()
+        controllerInstance.postDispatch()
+
+        if controllerPool is not None:
+            controllerInstance.dispatchCompleted()
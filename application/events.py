@@ -0,0 +1,10 @@
+# Application events, dispatched on the application's event dispatcher. They are defined apart from the models,
+# services and interfaces dispatching and observing them so that neither side depends on the other.
+
+# the models invalidated the cached responses built from the storage behind the tags in the event data,
+# e.g. {"tags": ["default.article"]}
+kEventResponseCacheInvalidate = "//event/responseCacheInvalidate"
+
+# the article model wrote a title, e.g. {"article_id": 1, "title": "Title"}, the title is None if the article was
+# deleted and the article ID is None if the written articles are unknown
+kEventArticleIndexUpdate = "//event/articleIndexUpdate"
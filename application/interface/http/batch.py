@@ -0,0 +1,198 @@
+import threading
+
+from twisted.logger import Logger
+from twisted.internet import reactor
+
+from nx.viper.interface import AbstractApplicationInterfaceProtocol
+
+
+class BatchEntryProtocol(AbstractApplicationInterfaceProtocol):
+    """
+    Interface protocol of a batch entry, collecting the entry's response for the batch.
+    """
+
+    def __init__(self, batch, index):
+        """
+        :param batch: <Batch> batch the entry belongs to
+        :param index: <int> entry position in the batch
+        """
+        self.setup()
+        self.batch = batch
+        self.index = index
+
+    def setResponseETag(self, eTag):
+        # conditional requests are not supported for batch entries
+        return False
+
+    #
+    # AbstractApplicationInterfaceProtocol
+    #
+    def getIPAddress(self):
+        return self.batch.requestProtocol.getIPAddress()
+
+    def requestPassedDispatcherValidation(self):
+        pass
+
+    def failRequestWithErrors(self, errors):
+        self.requestResponse["code"] = 400
+        self.requestResponse["content"] = None
+        self.requestResponse["errors"] += errors
+
+        self.sendFinalRequestResponse()
+
+    def sendPartialRequestResponse(self):
+        # batch entries do not support partial response
+        pass
+
+    def sendFinalRequestResponse(self):
+        self.batch.entryCompleted(self.index, dict(self.requestResponse))
+
+
+class Batch:
+    """
+    Batch of requests received in a single HTTP request.
+
+    The entries are dispatched concurrently on the reactor thread pool, the HTTP request is answered with the
+    responses of all entries, in the order of the entries, once the last one completes. Entries are not executed
+    in order, entries depending on each other must be sent in separate batches. Entries which did not complete
+    within entryTimeout seconds, such as entries whose controller failed on another thread, are answered with an
+    EntryTimeout error.
+    """
+    log = Logger()
+
+    def __init__(self, requestProtocol, dispatcher, entries, entryTimeout=0):
+        """
+        :param requestProtocol: <HTTPRequest> HTTP request carrying the batch
+        :param dispatcher: <nx.viper.dispatcher.Dispatcher> application request dispatcher
+        :param entries: <list> requests, each a dict with version, method and parameters
+        :param entryTimeout: <float> seconds the entries have to complete, 0 to disable
+        """
+        self.requestProtocol = requestProtocol
+        self.dispatcher = dispatcher
+        self.entries = entries
+        self.entryTimeout = entryTimeout
+
+        self._responses = [None] * len(entries)
+        self._pendingCount = len(entries)
+        self._lock = threading.Lock()
+        self._timeoutCall = None
+
+    @staticmethod
+    def parseEntry(entry):
+        """
+        Validate a batch entry and create its request payload.
+
+        :param entry: <object> decoded entry
+        :return: <dict> request payload, None if the entry is invalid
+        """
+        if not isinstance(entry, dict) or not isinstance(entry.get("method"), str):
+            return None
+
+        version = entry.get("version")
+        if not isinstance(version, (int, float)) or isinstance(version, bool):
+            return None
+
+        return {
+            "version": float(version),
+            "method": entry["method"],
+            "parameters": entry.get("parameters", {})
+        }
+
+    def dispatch(self):
+        """
+        Dispatch all entries.
+
+        :return: <void>
+        """
+        if len(self.entries) == 0:
+            self._sendResponse()
+            return
+
+        requestProfiler = self.requestProtocol.channel.httpFactory.requestProfiler
+
+        # scheduled before dispatching the entries, the timeout is cancelled once the last one completes
+        if self.entryTimeout > 0:
+            reactor.callFromThread(self._startTimeout)
+
+        for index, entry in enumerate(self.entries):
+            entryProtocol = BatchEntryProtocol(self, index)
+            requestPayload = self.parseEntry(entry)
+
+            if requestPayload is None:
+                entryProtocol.failRequestWithErrors(["InvalidBatchEntry"])
+            elif requestProfiler is not None and requestProfiler.isSampled(requestPayload["method"]):
+                reactor.callInThread(
+                    requestProfiler.run,
+                    requestPayload["method"],
+                    self._dispatchEntry,
+                    entryProtocol,
+                    requestPayload
+                )
+            else:
+                reactor.callInThread(self._dispatchEntry, entryProtocol, requestPayload)
+
+    def _dispatchEntry(self, entryProtocol, requestPayload):
+        try:
+            self.dispatcher.dispatch(entryProtocol, requestPayload)
+        except Exception as e:
+            self.log.error(
+                "[HTTP]: Batch entry {method} failed. Error: {error}",
+                method=requestPayload["method"],
+                error=str(e)
+            )
+            entryProtocol.failRequestWithErrors(["CannotPerformRequest"])
+
+    def _startTimeout(self):
+        with self._lock:
+            if self._pendingCount == 0:
+                return
+
+        self._timeoutCall = reactor.callLater(self.entryTimeout, self._timeOutEntries)
+
+    def _cancelTimeout(self):
+        if self._timeoutCall is not None and self._timeoutCall.active():
+            self._timeoutCall.cancel()
+
+        self._timeoutCall = None
+
+    def _timeOutEntries(self):
+        self._timeoutCall = None
+
+        with self._lock:
+            indexes = [index for index, response in enumerate(self._responses) if response is None]
+
+        for index in indexes:
+            self.log.warn(
+                "[HTTP]: Batch entry {method} did not complete within {timeout} seconds.",
+                method=self.entries[index].get("method") if isinstance(self.entries[index], dict) else None,
+                timeout=self.entryTimeout
+            )
+            self.entryCompleted(index, {"code": 500, "content": None, "errors": ["EntryTimeout"]})
+
+    def entryCompleted(self, index, response):
+        """
+        Record the response of an entry, answering the HTTP request if it was the last one.
+
+        :param index: <int> entry position in the batch
+        :param response: <dict> entry response
+        :return: <void>
+        """
+        with self._lock:
+            # ignoring any response sent after the first one
+            if self._responses[index] is not None:
+                return
+
+            self._responses[index] = response
+            self._pendingCount -= 1
+            if self._pendingCount > 0:
+                return
+
+        self._sendResponse()
+
+    def _sendResponse(self):
+        if self.entryTimeout > 0:
+            reactor.callFromThread(self._cancelTimeout)
+
+        self.requestProtocol.requestResponse["code"] = 200
+        self.requestProtocol.requestResponse["content"] = self._responses
+        self.requestProtocol.sendFinalRequestResponse()
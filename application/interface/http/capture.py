@@ -0,0 +1,90 @@
+import random
+
+from application.log import LogPipeline
+
+
+class TrafficCapture:
+    """
+    Capture of the HTTP requests, for replay with script/replay/replay.py.
+
+    A sample of the authenticated requests is written as JSON lines "request" records holding the arrival time,
+    version, method, sanitized parameters, response encoding, response code and duration. The client's address and
+    the request signature are never captured. The values of the parameters listed in redactedParameters, at any
+    depth, are replaced by placeholders of the same type and length so that replayed requests pass validation.
+
+    Records are written by a dedicated log pipeline, to their own file.
+    """
+
+    def __init__(self, captureConfig):
+        """
+        :param captureConfig: <dict> interface.http.capture configuration section
+        """
+        self.sampleRate = float(captureConfig["sampleRate"])
+        self.redactedParameters = frozenset(name.lower() for name in captureConfig["redactedParameters"])
+
+        self.logPipeline = LogPipeline(captureConfig)
+
+    def start(self):
+        """
+        Start writing captured requests.
+
+        :return: <void>
+        """
+        self.logPipeline.start()
+
+    def stop(self):
+        """
+        Write the captured requests still queued and stop.
+
+        :return: <void>
+        """
+        self.logPipeline.stop()
+
+    def isSampled(self):
+        """
+        Return whether a request should be captured.
+
+        :return: <bool>
+        """
+        return self.sampleRate >= 1 or random.random() < self.sampleRate
+
+    def _redact(self, value):
+        if isinstance(value, str):
+            return "x" * len(value)
+        if isinstance(value, bool):
+            return False
+        if isinstance(value, (int, float)):
+            return type(value)(0)
+        if isinstance(value, list):
+            return [None] * len(value)
+        if isinstance(value, dict):
+            return {}
+
+        return None
+
+    def sanitize(self, parameters):
+        """
+        Return a copy of request parameters with the redacted parameters replaced.
+
+        :param parameters: <object> decoded request parameters
+        :return: <object>
+        """
+        if isinstance(parameters, dict):
+            return {
+                name: self._redact(value) if name.lower() in self.redactedParameters else self.sanitize(value)
+                for name, value in parameters.items()
+            }
+
+        if isinstance(parameters, list):
+            return [self.sanitize(value) for value in parameters]
+
+        return parameters
+
+    def capture(self, requestRecord):
+        """
+        Write a captured request.
+
+        :param requestRecord: <dict> request details, with its arrival time
+        :return: <void>
+        """
+        self.logPipeline.logRecord("request", requestRecord)
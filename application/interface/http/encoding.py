@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timezone
+
+import msgpack
+
+
+class JSONEncoding:
+    """
+    JSON response encoding, datetimes are formatted as "%Y-%m-%d %H:%M:%S".
+    """
+    name = "json"
+    contentType = "application/json"
+    mediaTypes = ("application/json",)
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+
+        raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+    def encode(self, response):
+        """
+        Encode a response.
+
+        :param response: <dict> response envelope (code, content and errors)
+        :return: <bytes>
+        """
+        return json.dumps(response, sort_keys=True, default=self._default).encode()
+
+    def decode(self, data):
+        """
+        Decode request parameters.
+
+        :param data: <bytes> encoded parameters
+        :return: <object>
+        """
+        return json.loads(data)
+
+
+class MessagePackEncoding:
+    """
+    MessagePack response encoding, datetimes are encoded as timestamps. Naive datetimes are considered UTC, as the
+    ones stored by the application.
+    """
+    name = "msgpack"
+    contentType = "application/msgpack"
+    mediaTypes = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+
+        raise TypeError("Object of type {} is not MessagePack serializable".format(type(value).__name__))
+
+    def encode(self, response):
+        return msgpack.packb(response, default=self._default, datetime=True)
+
+    def decode(self, data):
+        # timestamps are decoded as UTC datetimes
+        try:
+            return msgpack.unpackb(data, timestamp=3)
+        except msgpack.UnpackException as e:
+            raise ValueError(str(e))
+
+
+jsonEncoding = JSONEncoding()
+messagePackEncoding = MessagePackEncoding()
+
+
+def getEncoding(mediaType, encodings):
+    """
+    Return the encoding of a media type.
+
+    :param mediaType: <str> media type, parameters are ignored
+    :param encodings: <tuple> available encodings
+    :return: <object> encoding, None if not available
+    """
+    mediaType = mediaType.split(";", 1)[0].strip().lower()
+    for encoding in encodings:
+        if mediaType in encoding.mediaTypes:
+            return encoding
+
+    return None
+
+
+def negotiateEncoding(accept, encodings):
+    """
+    Select the response encoding from the Accept header of a request. The encoding with the highest quality is
+    selected, the first one listed on ties. JSON is used if the header is missing or lists no available encoding.
+
+    :param accept: <str> Accept header value or None
+    :param encodings: <tuple> available encodings
+    :return: <object> encoding
+    """
+    if accept is None:
+        return jsonEncoding
+
+    selectedEncoding = jsonEncoding
+    selectedQuality = 0
+    for mediaRange in accept.split(","):
+        mediaType, _, parameters = mediaRange.partition(";")
+
+        encoding = getEncoding(mediaType, encodings)
+        if encoding is None:
+            continue
+
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+
+        if quality > selectedQuality:
+            selectedEncoding = encoding
+            selectedQuality = quality
+
+    return selectedEncoding
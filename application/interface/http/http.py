@@ -1,43 +1,95 @@
 import hmac
 import hashlib
-import json
+import signal
 from calendar import timegm
 from datetime import datetime
-
-from OpenSSL import crypto
+from time import monotonic, time
 
 from twisted.logger import Logger
-from twisted.internet import reactor, ssl
+from twisted.internet import reactor, defer
+from twisted.internet.protocol import Protocol
+from twisted.internet.task import LoopingCall
 from twisted.application import service
 from twisted.web.http import HTTPChannel, Request, HTTPFactory
-from twisted.protocols.policies import ProtocolWrapper, ThrottlingFactory, LimitConnectionsByPeer, TimeoutFactory
 
 from nx.viper.interface import AbstractApplicationInterfaceProtocol
 
-from application.interface.http.policies import PatchedProtocolWrapper, PatchedThrottlingFactory, PatchedLimitConnectionsByPeer
-
-# applying the patch for ProtocolWrapper
-ProtocolWrapper.makeConnection = PatchedProtocolWrapper.makeConnection
-ProtocolWrapper.dataReceived = PatchedProtocolWrapper.dataReceived
-ProtocolWrapper.connectionLost = PatchedProtocolWrapper.connectionLost
-# applying the patch for ThrottlingFactory
-ThrottlingFactory.log = Logger()
-ThrottlingFactory.buildProtocol = PatchedThrottlingFactory.buildProtocol
-# applying patch for LimitConnectionsByPeer
-LimitConnectionsByPeer.buildProtocol = PatchedLimitConnectionsByPeer.buildProtocol
-LimitConnectionsByPeer.unregisterProtocol = PatchedLimitConnectionsByPeer.unregisterProtocol
+from application.events import kEventResponseCacheInvalidate
+from application.interface.http.batch import Batch
+from application.interface.http.capture import TrafficCapture
+from application.interface.http.encoding import jsonEncoding, messagePackEncoding, getEncoding, negotiateEncoding
+from application.interface.http.policies import PeerConnections
+from application.interface.http.responseCache import ResponseCache
+from application.interface.http.tls import ReloadableCertificateOptions
+from application.profiling import RequestProfiler
 
 
 class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
     log = Logger()
 
+    _responseETag = None
+    _responseBody = None
+    _responseCacheEntry = None
+    _responseEncoding = jsonEncoding
+    _capturedRequest = None
+    _finalResponseSent = False
+
     def process(self):
         """
         Dispatches the request processing to background thread.
 
         :return: <void>
         """
-        reactor.callInThread(self.parseRequest)
+        # keeping track of the request until its response is sent in order to drain it on shutdown
+        self._httpFactory = self.channel.httpFactory
+        self._httpFactory.pendingRequests += 1
+        self._processStart = monotonic()
+
+        # profiling a sample of the requests, as selected by the profiler's control file
+        requestProfiler = self._httpFactory.requestProfiler
+        if requestProfiler is not None:
+            requestMethod = self.path.decode(errors="replace").rpartition("/")[2]
+            if requestProfiler.isSampled(requestMethod):
+                reactor.callInThread(self.handleRequest, requestProfiler.run, requestMethod, self.parseRequest)
+                return
+
+        reactor.callInThread(self.handleRequest, self.parseRequest)
+
+    def handleRequest(self, function, *args):
+        """
+        Runs the request handling on a worker thread. If it raises before the final response is sent the request
+        fails with an internal error, so that it is always completed.
+
+        :param function: <function> function handling the request
+        :param args: function arguments
+        :return: <void>
+        """
+        try:
+            function(*args)
+        except Exception as e:
+            self.log.error("[HTTP]: Error handling request: {error}", error=str(e))
+
+            if self._finalResponseSent:
+                return
+
+            try:
+                self.requestResponse["code"] = 500
+                self.requestResponse["content"] = None
+                self.requestResponse["errors"] = []
+                self.sendFinalRequestResponse()
+            except Exception as e:
+                self.log.error("[HTTP]: Error handling request: Cannot send 500: {error}", error=str(e))
+                reactor.callFromThread(self.requestCompleted)
+
+    def requestCompleted(self):
+        """
+        Marks the request as completed. Must be called from the reactor thread.
+
+        :return: <void>
+        """
+        if getattr(self, "_httpFactory", None) is not None:
+            self._httpFactory.pendingRequests -= 1
+            self._httpFactory = None
 
     def parseRequest(self):
         """
@@ -52,32 +104,52 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
             self.failRequestWithErrors(["CannotPerformRequest"])
             return
 
+        # selecting the response encoding, JSON unless the client accepts another available encoding
+        encodings = self.channel.httpFactory.encodings
+        self._responseEncoding = negotiateEncoding(self.getHeader("Accept"), encodings)
+
         requestUri = self.path.decode()
         segmentsUri = requestUri.split("/")
 
-        # validating URI
-        if len(segmentsUri) != 3:
-            self.failRequestWithErrors(["InvalidRequestUri", requestUri])
-            return
+        # batch requests carry the version and method of each entry in their parameters
+        isBatch = requestUri == "/batch" \
+            and self.channel.application.config["interface"]["http"]["batch"]["enabled"]
 
-        # request version
-        try:
-            requestVersion = float(segmentsUri[1])
-        except ValueError:
-            self.failRequestWithErrors(["InvalidRequestVersion"])
-            return
+        if not isBatch:
+            # validating URI
+            if len(segmentsUri) != 3:
+                self.failRequestWithErrors(["InvalidRequestUri", requestUri])
+                return
 
-        # request method
-        requestMethod = segmentsUri[2]
+            # request version
+            try:
+                requestVersion = float(segmentsUri[1])
+            except ValueError:
+                self.failRequestWithErrors(["InvalidRequestVersion"])
+                return
+
+            # request method
+            requestMethod = segmentsUri[2]
+
+        # request parameters, from the body of POST requests in an available encoding or from the parameters argument
+        requestParametersData = b""
+        requestParametersEncoding = None
+        requestContentType = self.getHeader("Content-Type")
+        if self.method == b"POST" and requestContentType is not None:
+            requestParametersEncoding = getEncoding(requestContentType, encodings)
+
+        if requestParametersEncoding is not None:
+            self.content.seek(0)
+            requestParametersData = self.content.read()
+        elif b"parameters" in self.args:
+            requestParametersData = self.args[b"parameters"][0]
+            requestParametersEncoding = jsonEncoding
 
-        # request parameters
         requestParameters = {}
-        if b"parameters" in self.args:
+        if requestParametersEncoding is not None:
             try:
-                requestParameters = json.loads(
-                    self.args[b"parameters"][0].decode()
-                )
-            except json.JSONDecodeError:
+                requestParameters = requestParametersEncoding.decode(requestParametersData)
+            except ValueError:
                 self.failRequestWithErrors(["InvalidParametersFormat"])
                 return
 
@@ -112,14 +184,11 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
                 self.failRequestAuthenticationWithErrors(["SignatureMissing"])
                 return
 
-            requestParametersString = ""
-            if b"parameters" in self.args:
-                requestParametersString = self.args[b"parameters"][0].decode()
-
-            payloadSignature = "{}|{}".format(requestParametersString, requestSignatureTime)
+            # signing the parameters as sent, request bodies included
+            payloadSignature = b"|".join((requestParametersData, str(requestSignatureTime).encode()))
             signature = hmac.new(
                 self.channel.application.config["interface"]["http"]["authentication"]["key"].encode(),
-                payloadSignature.encode(),
+                payloadSignature,
                 digestmod=hashlib.sha512
             )
 
@@ -127,6 +196,38 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
                 self.failRequestAuthenticationWithErrors(["SignatureInvalid"])
                 return
 
+        # capturing a sample of the authenticated requests for replay
+        trafficCapture = self.channel.httpFactory.trafficCapture
+        if trafficCapture is not None and trafficCapture.isSampled():
+            self._capturedRequest = {
+                "version": None if isBatch else requestVersion,
+                "method": "batch" if isBatch else requestMethod,
+                "parameters": trafficCapture.sanitize(requestParameters),
+                "encoding": self._responseEncoding.name
+            }
+
+        # dispatching batch entries, authenticated once for the whole batch
+        if isBatch:
+            self.dispatchBatch(requestParameters)
+            return
+
+        # serving cacheable methods from the response cache, once the request is authenticated
+        responseCache = self.channel.httpFactory.responseCache
+        if responseCache is not None:
+            cacheKey = responseCache.getKey(
+                requestVersion,
+                requestMethod,
+                requestParameters,
+                self._responseEncoding.name
+            )
+            if cacheKey is not None:
+                cachedResponse, cacheGeneration = responseCache.get(cacheKey)
+                if cachedResponse is not None:
+                    self.sendCachedRequestResponse(*cachedResponse)
+                    return
+
+                self._responseCacheEntry = (cacheKey, cacheGeneration)
+
         # creating request payload
         requestPayload = {}
         requestPayload["version"] = requestVersion
@@ -145,6 +246,76 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
 
         self.sendFinalRequestResponse()
 
+    def dispatchBatch(self, entries):
+        """
+        Dispatch the entries of a batch request, responding with the responses of the entries in their order.
+
+        :param entries: <list> requests, each a dict with version, method and parameters
+        :return: <void>
+        """
+        if not isinstance(entries, list):
+            self.failRequestWithErrors(["InvalidBatchFormat"])
+            return
+
+        if len(entries) > self.channel.application.config["interface"]["http"]["batch"]["maximumSize"]:
+            self.failRequestWithErrors(["BatchTooLarge"])
+            return
+
+        Batch(
+            self,
+            self.channel.application.requestDispatcher,
+            entries,
+            self.channel.application.config["interface"]["http"]["batch"]["entryTimeout"]
+        ).dispatch()
+
+    def setResponseETag(self, eTag):
+        """
+        Set the ETag of the response and check it against the request's If-None-Match header. The ETag of
+        responses which are not encoded as JSON is suffixed with the encoding's name, each encoding being a distinct
+        representation.
+
+        :param eTag: <str> quoted entity tag
+        :return: <bool> True if the client already has the response, in which case it can be answered with the 304
+                 response code without content
+        """
+        if self._responseEncoding is not jsonEncoding:
+            eTag = "{}-{}\"".format(eTag[:-1], self._responseEncoding.name)
+
+        return self._checkResponseETag(eTag)
+
+    def _checkResponseETag(self, eTag):
+        self._responseETag = eTag
+
+        ifNoneMatch = self.getHeader("If-None-Match")
+        if ifNoneMatch is None:
+            return False
+
+        for requestETag in ifNoneMatch.split(","):
+            requestETag = requestETag.strip()
+            if requestETag.startswith("W/"):
+                requestETag = requestETag[2:]
+
+            if requestETag == "*" or requestETag == eTag:
+                return True
+
+        return False
+
+    def sendCachedRequestResponse(self, body, eTag):
+        """
+        Send a response from the response cache without dispatching the request.
+
+        :param body: <bytes> encoded response
+        :param eTag: <str> response ETag or None
+        :return: <void>
+        """
+        # only responses with the 200 code are cached
+        self._responseBody = body
+        self.requestResponse["code"] = 200
+        if eTag is not None and self._checkResponseETag(eTag):
+            self.requestResponse["code"] = 304
+
+        self.sendFinalRequestResponse()
+
     #
     # AbstractApplicationInterfaceProtocol
     #
@@ -166,6 +337,8 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
         pass
 
     def sendFinalRequestResponse(self):
+        self._finalResponseSent = True
+
         def clearResponseCallback():
             # clearing response
             self.requestResponse["code"] = 0
@@ -173,56 +346,126 @@ class HTTPRequest(AbstractApplicationInterfaceProtocol, Request):
             self.requestResponse["errors"] = []
 
         def sendResponseCallback():
+            # the request must be completed even if the connection was lost or finishing it failed
             try:
-                # sending response
-                self.setResponseCode(200, "OK".encode())
-                self.setHeader("Content-Type", "application/json")
-                self.write(json.dumps(
-                    self.requestResponse,
-                    sort_keys=True
-                ).encode())
-            except Exception as e:
+                # the connection may have been lost since the response was scheduled
+                if getattr(self, "channel", None) is None:
+                    return
+
                 try:
-                    self.setResponseCode(500, "Internal Server Error".encode())
-                    self.setHeader("Content-Type", "application/json")
-                    self.write(json.dumps(
-                        {
+                    # the response encoding depends on the Accept header
+                    if len(self.channel.httpFactory.encodings) > 1:
+                        self.setHeader("Vary", "Accept")
+
+                    if self.requestResponse["code"] == 304:
+                        # the client's copy of the response is still valid
+                        self.setResponseCode(304, "Not Modified".encode())
+                        self.setHeader("ETag", self._responseETag)
+                    else:
+                        responseBody = self._responseBody
+                        if responseBody is None:
+                            responseBody = self._responseEncoding.encode(self.requestResponse)
+
+                            if self._responseCacheEntry is not None and self.requestResponse["code"] == 200:
+                                self.channel.httpFactory.responseCache.set(
+                                    *self._responseCacheEntry,
+                                    responseBody,
+                                    self._responseETag
+                                )
+
+                        # sending response
+                        self.setResponseCode(200, "OK".encode())
+                        self.setHeader("Content-Type", self._responseEncoding.contentType)
+                        if self._responseETag is not None:
+                            self.setHeader("ETag", self._responseETag)
+                        self.write(responseBody)
+                except Exception as e:
+                    try:
+                        self.setResponseCode(500, "Internal Server Error".encode())
+                        self.setHeader("Content-Type", self._responseEncoding.contentType)
+                        self.write(self._responseEncoding.encode({
                             "code": 500,
                             "content": None,
                             "errors": []
-                        },
-                        sort_keys=True
-                    ).encode())
-
-                    self.log.error("[HTTP]: Error sendFinalRequestResponse(): {error}", error=str(e))
-                except Exception as e:
-                    self.log.error(
-                        "[HTTP]: Error sendFinalRequestResponse(): Cannot send 500: {error}",
-                        error=str(e)
-                    )
-
-            # closing connection
-            keepAlive = False
-            if hasattr(self, "channel") and self.channel is not None \
-                    and self.channel.application.config["interface"]["http"]["connection"]["keepAlive"] != 0:
-                keepAlive = True
-
-            self.finish()
-            if not keepAlive:
-                self.transport.loseConnection()
-
-            clearResponseCallback()
+                        }))
+
+                        self.log.error("[HTTP]: Error sendFinalRequestResponse(): {error}", error=str(e))
+                    except Exception as e:
+                        self.log.error(
+                            "[HTTP]: Error sendFinalRequestResponse(): Cannot send 500: {error}",
+                            error=str(e)
+                        )
+
+                # closing connection
+                keepAlive = False
+                if hasattr(self, "channel") and self.channel is not None \
+                        and self.channel.application.config["interface"]["http"]["connection"]["keepAlive"] != 0 \
+                        and not self.channel.httpFactory.draining:
+                    keepAlive = True
+
+                if not keepAlive:
+                    self.setHeader("Connection", "close")
+
+                # the channel is detached from the request once finished
+                logPipeline = None
+                trafficCapture = None
+                if getattr(self, "channel", None) is not None:
+                    logPipeline = getattr(self.channel.application, "logPipeline", None)
+                    trafficCapture = self.channel.httpFactory.trafficCapture
+
+                self.finish()
+                if not keepAlive:
+                    self.transport.loseConnection()
+
+                # logging access through the application's log pipeline, if enabled
+                if logPipeline is not None:
+                    logPipeline.logAccess({
+                        "ip": self.getClientIP(),
+                        "method": self.method.decode(),
+                        "path": self.path.decode(),
+                        "code": self.requestResponse["code"],
+                        "errors": self.requestResponse["errors"],
+                        "duration": round((monotonic() - self._processStart) * 1000, 3),
+                        "length": self.sentLength
+                    })
+
+                if self._capturedRequest is not None and trafficCapture is not None:
+                    duration = monotonic() - self._processStart
+                    self._capturedRequest["time"] = time() - duration
+                    self._capturedRequest["code"] = self.requestResponse["code"]
+                    self._capturedRequest["duration"] = round(duration * 1000, 3)
+                    trafficCapture.capture(self._capturedRequest)
+            finally:
+                clearResponseCallback()
+                self.requestCompleted()
 
         # checking if any of the enabled policies closed the channel
         if hasattr(self, "channel") and self.channel is not None:
             reactor.callFromThread(sendResponseCallback)
         else:
             clearResponseCallback()
+            reactor.callFromThread(self.requestCompleted)
 
 
 class HTTPProtocol(HTTPChannel):
     requestFactory = HTTPRequest
 
+    def dataReceived(self, data):
+        self.lastActivity = reactor.seconds()
+        HTTPChannel.dataReceived(self, data)
+
+    def write(self, data):
+        self.lastActivity = reactor.seconds()
+        HTTPChannel.write(self, data)
+
+    def writeSequence(self, iovec):
+        self.lastActivity = reactor.seconds()
+        HTTPChannel.writeSequence(self, iovec)
+
+    def connectionLost(self, reason):
+        HTTPChannel.connectionLost(self, reason)
+        self.httpFactory.channelClosed(self)
+
     def timeoutConnection(self):
         """
         Overriding HTTPChannel timeoutConnection to prevent logging pollution.
@@ -258,10 +501,104 @@ class HTTPProtocol(HTTPChannel):
             pass
 
 
+class RejectedConnectionProtocol(Protocol):
+    """
+    Protocol of a connection rejected by the connection policies, aborted as soon as it is made. The factory does not
+    return None for rejected connections since the TLS wrapper would then fail on every rejected connection and
+    leave its socket open.
+    """
+
+    def connectionMade(self):
+        self.transport.abortConnection()
+
+
 class HTTPFactory(HTTPFactory):
+    """
+    HTTP factory enforcing the connection policies.
+
+    The maximum number of connections, the maximum number of connections per peer and the idle timeout are
+    enforced directly by the factory and its protocols, instead of daisy chaining Twisted's policy wrappers which
+    add a layer forwarding every call for each policy.
+    """
+    log = Logger()
+
+    responseCache = None
+    encodings = (jsonEncoding,)
+    trafficCapture = None
+    requestProfiler = None
+
+    def __init__(self, maximumConnections=50, maximumConnectionsByPeer=5, peerPrefixLengthIPv4=32,
+                 peerPrefixLengthIPv6=128, connectionTimeout=0, *args, **kwargs):
+        """
+        :param maximumConnections: <int> maximum number of open connections
+        :param maximumConnectionsByPeer: <int> maximum number of open connections by peer
+        :param peerPrefixLengthIPv4: <int> IPv4 network prefix length peers are aggregated by
+        :param peerPrefixLengthIPv6: <int> IPv6 network prefix length peers are aggregated by
+        :param connectionTimeout: <float> seconds an idle connection is kept open, 0 to disable
+        """
+        super(HTTPFactory, self).__init__(*args, **kwargs)
+
+        self.maximumConnections = maximumConnections
+        self.maximumConnectionsByPeer = maximumConnectionsByPeer
+        self.connectionTimeout = connectionTimeout
+
+        # open channels and requests waiting for their response, used to drain the interface on shutdown
+        self.channels = set()
+        self.pendingRequests = 0
+        self.draining = False
+
+        self.peerConnections = PeerConnections(peerPrefixLengthIPv4, peerPrefixLengthIPv6)
+        self._timeoutCheck = None
+
+    def startFactory(self):
+        super(HTTPFactory, self).startFactory()
+
+        # idle connections are looked up periodically instead of keeping a timer for each connection
+        if self.connectionTimeout > 0:
+            self._timeoutCheck = LoopingCall(self._timeoutIdleChannels)
+            self._timeoutCheck.start(min(max(self.connectionTimeout / 10, 1), 30), False)
+
+    def stopFactory(self):
+        if self._timeoutCheck is not None and self._timeoutCheck.running:
+            self._timeoutCheck.stop()
+        self._timeoutCheck = None
+
+        super(HTTPFactory, self).stopFactory()
+
+    def _timeoutIdleChannels(self):
+        idleSince = reactor.seconds() - self.connectionTimeout
+        for channel in [channel for channel in self.channels if channel.lastActivity < idleSince]:
+            channel.timeoutConnection()
+
+    def channelClosed(self, channel):
+        """
+        Release the resources accounted for a closed channel. Calling it more than once has no effect.
+
+        :param channel: <HTTPProtocol>
+        :return: <void>
+        """
+        self.channels.discard(channel)
+
+        if channel.peerKey is not None:
+            self.peerConnections.release(channel.peerKey)
+            channel.peerKey = None
+
     def buildProtocol(self, addr):
+        if len(self.channels) >= self.maximumConnections:
+            self.log.warn("[HTTP]: Started throttling connections. Reason: maximum connection count reached.")
+            return RejectedConnectionProtocol()
+
+        peerKey = self.peerConnections.acquire(addr.host, self.maximumConnectionsByPeer)
+        if peerKey is None:
+            return RejectedConnectionProtocol()
+
         protocol = HTTPProtocol()
         protocol.application = self.application
+        # not using the factory attribute since HTTPChannel would start writing Twisted's access log
+        protocol.httpFactory = self
+        protocol.peerKey = peerKey
+        protocol.lastActivity = reactor.seconds()
+        self.channels.add(protocol)
 
         if self.keepAlive > 0:
             protocol.setTimeout(self.keepAlive)
@@ -277,8 +614,13 @@ class HTTPFactory(HTTPFactory):
 
 
 class Service(service.Service):
+    log = Logger()
+
     def __init__(self, application):
         self.application = application
+        self._httpFactory = None
+        self._listeningPorts = []
+        self._certificateReload = None
 
     def startService(self):
         """
@@ -294,107 +636,172 @@ class Service(service.Service):
                 "per peer."
             )
 
-        # creating HTTP factory
-        httpFactory = HTTPFactory()
+        # creating HTTP factory, enforcing the connection policies
+        connectionConfig = self.application.config["interface"]["http"]["connection"]
+        httpFactory = HTTPFactory(
+            maximumConnections=connectionConfig["maximum"],
+            maximumConnectionsByPeer=connectionConfig["maximumByPeer"],
+            peerPrefixLengthIPv4=connectionConfig["peerPrefixLengthIPv4"],
+            peerPrefixLengthIPv6=connectionConfig["peerPrefixLengthIPv6"],
+            connectionTimeout=connectionConfig["timeout"]
+        )
+        self._httpFactory = httpFactory
         httpFactory.application = self.application
         httpFactory.keepAlive = (
             self.application.config["interface"]["http"]["connection"]["keepAlive"]
         )
 
-        # enabling timeout policy
-        if self.application.config["interface"]["http"]["connection"]["timeout"] > 0:
-            httpTimeoutFactory = TimeoutFactory(
-                httpFactory,
-                self.application.config["interface"]["http"]["connection"]["timeout"]
+        # enabling response cache, invalidated by the models writing to the storage backing the cached methods
+        if self.application.config["interface"]["http"]["responseCache"]["enabled"]:
+            httpFactory.responseCache = ResponseCache(
+                self.application.config["interface"]["http"]["responseCache"]["methods"],
+                self.application.config["interface"]["http"]["responseCache"]["timeToLive"],
+                self.application.config["interface"]["http"]["responseCache"]["maximumSize"]
+            )
+            self.application.eventDispatcher.addObserver(
+                kEventResponseCacheInvalidate,
+                self._invalidateResponseCache
             )
-        else:
-            httpTimeoutFactory = httpFactory
 
-        # enabling connection peer limit policy
-        httpConnectionLimitFactory = LimitConnectionsByPeer(httpTimeoutFactory)
-        httpConnectionLimitFactory.maxConnectionsPerPeer = \
-            self.application.config["interface"]["http"]["connection"]["maximumByPeer"]
+        # enabling MessagePack, negotiated with the Accept header for responses and the Content-Type header for requests
+        if self.application.config["interface"]["http"]["messagePack"]["enabled"]:
+            httpFactory.encodings = (jsonEncoding, messagePackEncoding)
 
-        # enabling throttle policy
-        httpThrottleFactory = ThrottlingFactory(
-            httpConnectionLimitFactory,
-            self.application.config["interface"]["http"]["connection"]["maximum"]
-        )
+        # capturing requests for replay
+        if self.application.config["interface"]["http"]["capture"]["enabled"]:
+            httpFactory.trafficCapture = TrafficCapture(self.application.config["interface"]["http"]["capture"])
+            httpFactory.trafficCapture.start()
+
+        # profiling requests when asked to at runtime
+        if self.application.config["performance"]["profiling"]["enabled"]:
+            httpFactory.requestProfiler = RequestProfiler(self.application.config["performance"]["profiling"])
+            httpFactory.requestProfiler.start()
 
         # starting default (unsecure) http interface
         if self.application.config["interface"]["http"]["default"]["enabled"]:
             if len(self.application.config["interface"]["http"]["ip"]) == 0:
-                self._reactor = reactor.listenTCP(
+                self._listeningPorts.append(reactor.listenTCP(
                     self.application.config["interface"]["http"]["default"]["port"],
-                    httpThrottleFactory,
+                    httpFactory,
                     self.application.config["interface"]["http"]["connection"]["queueSize"]
-                )
+                ))
             else:
                 for interfaceIP in self.application.config["interface"]["http"]["ip"]:
-                    self._reactor = reactor.listenTCP(
+                    self._listeningPorts.append(reactor.listenTCP(
                         self.application.config["interface"]["http"]["default"]["port"],
-                        httpThrottleFactory,
+                        httpFactory,
                         self.application.config["interface"]["http"]["connection"]["queueSize"],
                         interfaceIP
-                    )
+                    ))
 
         # starting TLS (secure) http interface
         if self.application.config["interface"]["http"]["tls"]["enabled"]:
-            # loading certificate
-            certFile = open(self.application.config["interface"]["http"]["tls"]["certificatePath"], "rt")
-            certData = certFile.read()
-            certFile.close()
-            certificate = crypto.load_certificate(crypto.FILETYPE_PEM, certData)
-
-            # loading private key
-            privateKeyFile = open(self.application.config["interface"]["http"]["tls"]["privateKeyPath"], "rt")
-            privateKeyData = privateKeyFile.read()
-            privateKeyFile.close()
-
-            privateKeyPassphrase = None
-            if len(self.application.config["interface"]["http"]["tls"]["privateKeyPassphrase"]) > 0:
-                privateKeyPassphrase = \
-                    self.application.config["interface"]["http"]["tls"]["privateKeyPassphrase"].encode()
-            privateKey = crypto.load_privatekey(crypto.FILETYPE_PEM, privateKeyData, privateKeyPassphrase)
-
-            # loading certificate chain
-            certChain = []
-            if len(self.application.config["interface"]["http"]["tls"]["certificateChainPaths"]) > 0:
-                for chainPath in self.application.config["interface"]["http"]["tls"]["certificateChainPaths"]:
-                    chainFile = open(chainPath, "rt")
-                    chainData = chainFile.read()
-                    chainFile.close()
-                    certChain.append(crypto.load_certificate(crypto.FILETYPE_PEM, chainData))
-
-            # creating the certificate options for reactor
-            certificateOptions = ssl.CertificateOptions(
-                certificate=certificate,
-                privateKey=privateKey,
-                extraCertChain=certChain
-            )
+            # loading certificate, private key and chain
+            certificateOptions = ReloadableCertificateOptions(self.application.config["interface"]["http"]["tls"])
+
+            # reloading the certificate when the files change or when asked to using SIGHUP
+            if self.application.config["interface"]["http"]["tls"]["reloadInterval"] > 0:
+                self._certificateReload = LoopingCall(certificateOptions.reloadIfChanged)
+                self._certificateReload.start(
+                    self.application.config["interface"]["http"]["tls"]["reloadInterval"],
+                    False
+                )
+
+            if self.application.config["interface"]["http"]["tls"]["reloadOnSignal"] and hasattr(signal, "SIGHUP"):
+                signal.signal(
+                    signal.SIGHUP,
+                    lambda signalNumber, frame: reactor.callFromThread(certificateOptions.reload)
+                )
 
             if len(self.application.config["interface"]["http"]["ip"]) == 0:
-                self._reactor = reactor.listenSSL(
+                self._listeningPorts.append(reactor.listenSSL(
                     self.application.config["interface"]["http"]["tls"]["port"],
-                    httpThrottleFactory,
+                    httpFactory,
                     certificateOptions,
                     self.application.config["interface"]["http"]["connection"]["queueSize"]
-                )
+                ))
             else:
                 for interfaceIP in self.application.config["interface"]["http"]["ip"]:
-                    self._reactor = reactor.listenSSL(
+                    self._listeningPorts.append(reactor.listenSSL(
                         self.application.config["interface"]["http"]["tls"]["port"],
-                        httpThrottleFactory,
+                        httpFactory,
                         certificateOptions,
                         self.application.config["interface"]["http"]["connection"]["queueSize"],
                         interfaceIP
-                    )
+                    ))
 
+    def _invalidateResponseCache(self, data):
+        """
+        Method called when a model invalidates cached responses.
+
+        :param data: <dict> event data object
+            :param tags: <list> tags of the responses to remove (module.controller)
+        :return: <void>
+        """
+        self._httpFactory.responseCache.invalidate(data["tags"])
+
+    def getTopPeers(self, count=10):
+        """
+        Return the peers (or peer networks, if aggregated) with the most open connections.
+
+        :param count: <int> number of peers
+        :return: <list> tuples of network and connection count, empty if the interface is not started
+        """
+        if self._httpFactory is None:
+            return []
+
+        return self._httpFactory.peerConnections.getTopPeers(count)
 
     def stopService(self):
         """
         Stops the HTTP/S interface and deattaches it from the application.
+        Requests already received are allowed to complete, bounded by the configured shutdown timeout, while
+        idle keep-alive connections are closed right away.
 
-        :return: <void>
+        :return: <Deferred>
         """
-        self._reactor.stopListening()
+        if self._certificateReload is not None and self._certificateReload.running:
+            self._certificateReload.stop()
+
+        stopping = [defer.maybeDeferred(port.stopListening) for port in self._listeningPorts]
+        self._listeningPorts = []
+
+        # startService() did not complete
+        if self._httpFactory is None:
+            return defer.DeferredList(stopping)
+
+        self._httpFactory.draining = True
+
+        # busy connections are closed after sending their response
+        for channel in list(self._httpFactory.channels):
+            if len(channel.requests) == 0 and channel.transport is not None:
+                channel.transport.loseConnection()
+
+        drainStart = reactor.seconds()
+        drained = defer.Deferred()
+
+        def checkPendingRequests():
+            if self._httpFactory.pendingRequests <= 0:
+                drained.callback(None)
+            elif reactor.seconds() - drainStart >= \
+                    self.application.config["interface"]["http"]["connection"]["shutdownTimeout"]:
+                self.log.warn(
+                    "[HTTP]: Shutdown timeout reached with {count} requests still pending.",
+                    count=self._httpFactory.pendingRequests
+                )
+                drained.callback(None)
+            else:
+                reactor.callLater(0.1, checkPendingRequests)
+
+        checkPendingRequests()
+
+        # writing the requests captured until the last response
+        if self._httpFactory.trafficCapture is not None:
+            drained.addCallback(lambda result: self._httpFactory.trafficCapture.stop())
+
+        if self._httpFactory.requestProfiler is not None:
+            drained.addCallback(lambda result: self._httpFactory.requestProfiler.stop())
+
+        stopping.append(drained)
+
+        return defer.DeferredList(stopping)
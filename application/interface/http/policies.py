@@ -1,79 +1,115 @@
-from zope.interface import directlyProvides, providedBy
+import heapq
+import socket
 
-from twisted.logger import Logger
-from twisted.protocols.policies import Protocol, ProtocolWrapper, WrappingFactory, ThrottlingFactory, LimitConnectionsByPeer
 
-
-class PatchedProtocolWrapper(ProtocolWrapper):
-    """
-    MonkeyPatch
-
-    The HTTP interface implements multiple policies (Throttling, LimitConnectionsByPeer, Timeout)
-    in order to keep the server resources in check and prevent DoS attacks.
-    These policies are daisy chained around the HTTPFactory and the connection must pass each one
-    before it reaches the HTTPFactory.
-    Unfortunately if one of the policies cancels the connection, the rest of the chain is not notified.
-
-    This worsens the situation because Twisted's ProtocolWrapper does not check if the wrappedProtocol
-    actually exists, further polluting the log with unhandled exceptions.
+class PeerConnections:
     """
-    def makeConnection(self, transport):
-        directlyProvides(self, providedBy(transport))
-        Protocol.makeConnection(self, transport)
-        self.factory.registerProtocol(self)
-
-        if self.wrappedProtocol is not None:
-            self.wrappedProtocol.makeConnection(self)
-
-    def dataReceived(self, data):
-        if self.wrappedProtocol is not None:
-            self.wrappedProtocol.dataReceived(data)
-
-    def connectionLost(self, reason):
-        self.factory.unregisterProtocol(self)
-        if self.wrappedProtocol is not None:
-            self.wrappedProtocol.connectionLost(reason)
-
+    Connection count by peer.
 
-class PatchedThrottlingFactory(ThrottlingFactory):
+    Peer addresses are packed into integers, IPv6 addresses being offset above the IPv4 range, and optionally
+    aggregated by network prefix so that a whole /24 or /64 shares a single entry. Entries are removed as soon as
+    their last connection closes, the number of tracked peers is therefore bounded by the maximum number of open
+    connections.
     """
-    MonkeyPatch
-
-    Twisted's ThrottlingFactory does not provide a method to override the automatic logging.
-    """
-    log = Logger()
-
-    def buildProtocol(self, addr):
-        if self.connectionCount == 0:
-            if self.readLimit is not None:
-                self.checkReadBandwidth()
-            if self.writeLimit is not None:
-                self.checkWriteBandwidth()
-
-        if self.connectionCount < self.maxConnectionCount:
-            self.connectionCount += 1
-            return WrappingFactory.buildProtocol(self, addr)
-        else:
-            self.log.warn("[HTTP]: Started throttling connections. Reason: maximum connection count reached.")
+    kIPv6Offset = 1 << 32
+
+    def __init__(self, prefixLengthIPv4=32, prefixLengthIPv6=128):
+        """
+        :param prefixLengthIPv4: <int> IPv4 network prefix length used for aggregation
+        :param prefixLengthIPv6: <int> IPv6 network prefix length used for aggregation
+        """
+        self.prefixLengthIPv4 = prefixLengthIPv4
+        self.prefixLengthIPv6 = prefixLengthIPv6
+        self.rejectedCount = 0
+
+        self._maskIPv4 = ((1 << prefixLengthIPv4) - 1) << (32 - prefixLengthIPv4)
+        self._maskIPv6 = ((1 << prefixLengthIPv6) - 1) << (128 - prefixLengthIPv6)
+        self._counts = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def getKey(self, host):
+        """
+        Pack a peer address into its aggregated integer key.
+
+        :param host: <str> peer IP address
+        :return: <int> key, or the host itself if it is not an IP address
+        """
+        try:
+            if ":" not in host:
+                return int.from_bytes(socket.inet_pton(socket.AF_INET, host), "big") & self._maskIPv4
+
+            address = int.from_bytes(socket.inet_pton(socket.AF_INET6, host), "big")
+        except OSError:
+            return host
+
+        # IPv4-mapped IPv6 addresses are accounted as IPv4
+        if address >> 32 == 0xFFFF:
+            return address & 0xFFFFFFFF & self._maskIPv4
+
+        return self.kIPv6Offset + (address & self._maskIPv6)
+
+    def formatKey(self, key):
+        """
+        Convert a key back to the network it represents.
+
+        :param key: <int> key
+        :return: <str>
+        """
+        if not isinstance(key, int):
+            return key
+
+        if key < self.kIPv6Offset:
+            return "{}/{}".format(
+                socket.inet_ntop(socket.AF_INET, key.to_bytes(4, "big")),
+                self.prefixLengthIPv4
+            )
+
+        return "{}/{}".format(
+            socket.inet_ntop(socket.AF_INET6, (key - self.kIPv6Offset).to_bytes(16, "big")),
+            self.prefixLengthIPv6
+        )
+
+    def acquire(self, host, maximumConnections):
+        """
+        Account a new connection for a peer.
+
+        :param host: <str> peer IP address
+        :param maximumConnections: <int> maximum connections allowed for the peer
+        :return: <int> peer key if the connection is allowed, None otherwise
+        """
+        key = self.getKey(host)
+        connectionCount = self._counts.get(key, 0)
+
+        if connectionCount >= maximumConnections:
+            self.rejectedCount += 1
             return None
 
-
-class PatchedLimitConnectionsByPeer(LimitConnectionsByPeer):
-    """
-    MonkeyPatch
-
-    Twisted's LimitConnectionsByPeer handles IPv4Address/IPv6Address incorrectly which renders this policy unusable.
-    """
-    def buildProtocol(self, addr):
-        peerHost = addr.host
-        connectionCount = self.peerConnections.get(peerHost, 0)
-        if connectionCount >= self.maxConnectionsPerPeer:
-            return None
-        self.peerConnections[peerHost] = connectionCount + 1
-        return WrappingFactory.buildProtocol(self, addr)
-
-    def unregisterProtocol(self, p):
-        peerHost = p.getPeer().host
-        self.peerConnections[peerHost] -= 1
-        if self.peerConnections[peerHost] == 0:
-            del self.peerConnections[peerHost]
+        self._counts[key] = connectionCount + 1
+        return key
+
+    def release(self, key):
+        """
+        Account a closed connection. Releasing a key which is not tracked is ignored.
+
+        :param key: <int> peer key returned by acquire()
+        :return: <void>
+        """
+        connectionCount = self._counts.get(key, 0)
+        if connectionCount > 1:
+            self._counts[key] = connectionCount - 1
+        elif connectionCount == 1:
+            del self._counts[key]
+
+    def getTopPeers(self, count=10):
+        """
+        Return the peers with the most open connections.
+
+        :param count: <int> number of peers
+        :return: <list> tuples of network and connection count
+        """
+        return [
+            (self.formatKey(key), connectionCount)
+            for key, connectionCount in heapq.nlargest(count, self._counts.items(), key=lambda item: item[1])
+        ]
@@ -0,0 +1,119 @@
+import json
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+class ResponseCache:
+    """
+    In-memory cache of encoded responses for idempotent methods.
+
+    Responses are keyed by request version, method and canonical parameters and tagged with the method's module and
+    controller (e.g. default.article). Models invalidate a tag when they write to the storage backing it by
+    dispatching application.events.kEventResponseCacheInvalidate with the tags as data, e.g.
+    {"tags": ["default.article"]}.
+
+    Each tag has a generation incremented on invalidation, a response is stored only if its tag was not
+    invalidated since the lookup which missed, so a response produced from data read before a write is never cached.
+    """
+
+    def __init__(self, methods, timeToLive, maximumSize):
+        """
+        :param methods: <list> cacheable methods (module.controller.action)
+        :param timeToLive: <float> seconds a response is served from cache
+        :param maximumSize: <int> maximum number of cached responses, least recently used ones are evicted first
+        """
+        self.methods = frozenset(methods)
+        self.timeToLive = timeToLive
+        self.maximumSize = maximumSize
+
+        self.hitCount = 0
+        self.missCount = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tagGenerations = {}
+
+    def getKey(self, version, method, parameters, encoding="json"):
+        """
+        Return the cache key of a request, None if the method is not cacheable.
+
+        :param version: <float> request version
+        :param method: <str> request method
+        :param parameters: <dict> request parameters
+        :param encoding: <str> response encoding name
+        :return: <tuple>
+        """
+        if method not in self.methods:
+            return None
+
+        # parameters decoded from MessagePack may not have a JSON representation
+        try:
+            canonicalParameters = json.dumps(parameters, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+
+        return version, method, canonicalParameters, encoding
+
+    def get(self, key):
+        """
+        Return a cached response.
+
+        :param key: <tuple> cache key
+        :return: <tuple> cached response as (body, ETag) if found, otherwise the tag generation to pass to set()
+        """
+        tag = key[1].rpartition(".")[0]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > monotonic():
+                    self._entries.move_to_end(key)
+                    self.hitCount += 1
+                    return entry[1], None
+
+                del self._entries[key]
+
+            self.missCount += 1
+            return None, self._tagGenerations.get(tag, 0)
+
+    def set(self, key, generation, body, eTag):
+        """
+        Store a response, unless its tag was invalidated since the lookup.
+
+        :param key: <tuple> cache key
+        :param generation: <int> tag generation returned by get()
+        :param body: <bytes> encoded response
+        :param eTag: <str> response ETag or None
+        :return: <void>
+        """
+        tag = key[1].rpartition(".")[0]
+
+        with self._lock:
+            if self._tagGenerations.get(tag, 0) != generation:
+                return
+
+            self._entries[key] = (monotonic() + self.timeToLive, (body, eTag), tag)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maximumSize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags):
+        """
+        Remove the responses with any of the tags.
+
+        :param tags: <list> tags (module.controller)
+        :return: <void>
+        """
+        tags = set(tags)
+
+        with self._lock:
+            for tag in tags:
+                self._tagGenerations[tag] = self._tagGenerations.get(tag, 0) + 1
+
+            for key in [key for key, entry in self._entries.items() if entry[2] in tags]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
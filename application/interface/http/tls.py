@@ -0,0 +1,136 @@
+import os
+
+from OpenSSL import crypto
+from zope.interface import implementer
+
+from twisted.logger import Logger
+from twisted.internet import ssl
+from twisted.internet.interfaces import IOpenSSLServerConnectionCreator
+
+
+@implementer(IOpenSSLServerConnectionCreator)
+class ReloadableCertificateOptions:
+    """
+    TLS options for the HTTP interface.
+
+    Wraps Twisted's CertificateOptions in order to enable session resumption, restrict the key exchange to ECDHE
+    and allow replacing the certificate, private key and chain without restarting the listeners. The options are
+    consulted for every new connection, a reload only affects connections accepted afterwards.
+    """
+    log = Logger()
+
+    def __init__(self, tlsConfig):
+        """
+        :param tlsConfig: <dict> TLS section of the HTTP interface configuration
+        """
+        self.config = tlsConfig
+
+        self._options = None
+        self._filesState = None
+
+        if not self.reload():
+            raise ValueError("[HTTP]: Cannot load TLS certificate.")
+
+    def _getFilePaths(self):
+        return [self.config["certificatePath"], self.config["privateKeyPath"]] + \
+            list(self.config["certificateChainPaths"])
+
+    def _getFilesState(self):
+        filesState = []
+        for filePath in self._getFilePaths():
+            fileStat = os.stat(filePath)
+            filesState.append((fileStat.st_mtime_ns, fileStat.st_size))
+
+        return filesState
+
+    def _loadOptions(self):
+        """
+        Load the certificate files and create the Twisted TLS options.
+
+        :return: <CertificateOptions>
+        """
+        # loading certificate
+        certFile = open(self.config["certificatePath"], "rt")
+        certData = certFile.read()
+        certFile.close()
+        certificate = crypto.load_certificate(crypto.FILETYPE_PEM, certData)
+
+        # loading private key
+        privateKeyFile = open(self.config["privateKeyPath"], "rt")
+        privateKeyData = privateKeyFile.read()
+        privateKeyFile.close()
+
+        privateKeyPassphrase = None
+        if len(self.config["privateKeyPassphrase"]) > 0:
+            privateKeyPassphrase = self.config["privateKeyPassphrase"].encode()
+        privateKey = crypto.load_privatekey(crypto.FILETYPE_PEM, privateKeyData, privateKeyPassphrase)
+
+        # loading certificate chain
+        certChain = []
+        for chainPath in self.config["certificateChainPaths"]:
+            chainFile = open(chainPath, "rt")
+            chainData = chainFile.read()
+            chainFile.close()
+            certChain.append(crypto.load_certificate(crypto.FILETYPE_PEM, chainData))
+
+        # creating the certificate options for reactor
+        options = ssl.CertificateOptions(
+            certificate=certificate,
+            privateKey=privateKey,
+            extraCertChain=certChain,
+            enableSessions=self.config["sessionCache"],
+            enableSessionTickets=self.config["sessionTickets"],
+            acceptableCiphers=ssl.AcceptableCiphers.fromOpenSSLCipherString(self.config["ciphers"]),
+            raiseMinimumTo=getattr(ssl.TLSVersion, self.config["minimumVersion"])
+        )
+
+        # creating the shared context right away in order to surface configuration errors while loading
+        context = options.getContext()
+        context.set_timeout(int(self.config["sessionTimeout"]))
+        if len(self.config["curve"]) > 0:
+            context.set_tmp_ecdh(crypto.get_elliptic_curve(self.config["curve"]))
+
+        return options
+
+    def reload(self):
+        """
+        Load the certificate files, keeping the current options if loading fails.
+
+        :return: <bool> True if loaded successfully, False otherwise
+        """
+        try:
+            filesState = self._getFilesState()
+            options = self._loadOptions()
+        except Exception as e:
+            self.log.error("[HTTP]: Cannot load TLS certificate. Error: {error}", error=str(e))
+            return False
+
+        self._options = options
+        self._filesState = filesState
+        self.log.info("[HTTP]: TLS certificate loaded.")
+
+        return True
+
+    def reloadIfChanged(self):
+        """
+        Reload the certificate files if any of them changed since they were loaded.
+
+        :return: <void>
+        """
+        try:
+            filesState = self._getFilesState()
+        except OSError as e:
+            self.log.warn("[HTTP]: Cannot check TLS certificate files. Error: {error}", error=str(e))
+            return
+
+        if filesState != self._filesState:
+            self.reload()
+
+    #
+    # IOpenSSLServerConnectionCreator
+    #
+    def serverConnectionForTLS(self, tlsProtocol):
+        return self._options.serverConnectionForTLS(tlsProtocol)
+
+    def getContext(self):
+        return self._options.getContext()
@@ -0,0 +1,259 @@
+import json
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from time import time
+
+from zope.interface import implementer
+
+from twisted.logger import ILogObserver, formatEvent
+from twisted.python.logfile import LogFile
+
+
+@implementer(ILogObserver)
+class LogPipeline:
+    """
+    Structured, non-blocking log pipeline
+
+    Log observer writing Twisted log events and structured records, such as HTTP access events, as JSON lines.
+    Callers only enqueue events, a dedicated writer thread formats and writes them in batches. When the bounded queue
+    is full events are dropped instead of blocking the caller. High-volume events can be sampled by kind (a record
+    type or a log level) using sampleRates.
+
+    The writer thread is started once the reactor runs, events emitted before are queued. Drop and sampling
+    counters are written to the log when they change.
+    """
+    kStop = object()
+
+    def __init__(self, logConfig):
+        """
+        :param logConfig: <dict> log configuration section
+        """
+        self.config = logConfig
+
+        self.queuedCount = 0
+        self.writtenCount = 0
+        self.droppedCount = 0
+        self.sampledOutCount = 0
+
+        self._queue = queue.Queue(int(logConfig["queueSize"]))
+        self._sampleRates = dict(logConfig.get("sampleRates", {}))
+        self._logFile = None
+        # the writer thread may still be writing when stop() times out, the remaining events are then dropped instead
+        # of waiting for it
+        self._logFileLock = threading.Lock()
+        self._writer = None
+        self._stopRequested = threading.Event()
+        self._stopped = False
+        self._reportedCounters = (0, 0)
+
+    def start(self):
+        """
+        Open the log file and start the writer thread.
+
+        :return: <void>
+        """
+        self._logFile = LogFile.fromFullPath(
+            self.config["path"],
+            rotateLength=int(self.config["rotateLength"]),
+            maxRotatedFiles=int(self.config["maxRotatedFiles"])
+        )
+
+        self._writer = threading.Thread(target=self._write, name="application.log", daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        """
+        Write the queued events and stop the writer thread, waiting at most shutdownTimeout seconds for it. Events
+        emitted afterwards are written synchronously.
+
+        :return: <void>
+        """
+        if self._writer is None:
+            return
+
+        try:
+            self._queue.put_nowait(self.kStop)
+        except queue.Full:
+            # the writer is behind or blocked, it stops after its current batch, the queued events being written below
+            self._stopRequested.set()
+
+        self._writer.join(float(self.config.get("shutdownTimeout", 5)))
+        self._writer = None
+        self._stopped = True
+
+        # writing the events queued while stopping
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self._writeEntries([entry for entry in entries if entry is not self.kStop], False)
+
+    def _isSampledOut(self, kind):
+        sampleRate = self._sampleRates.get(kind)
+        if sampleRate is None or sampleRate >= 1:
+            return False
+
+        if random.random() < sampleRate:
+            return False
+
+        self.sampledOutCount += 1
+        return True
+
+    def _enqueue(self, entry):
+        if self._stopped:
+            self._writeEntries([entry], False)
+            return
+
+        try:
+            self._queue.put_nowait(entry)
+            self.queuedCount += 1
+        except queue.Full:
+            self.droppedCount += 1
+
+    def __call__(self, event):
+        """
+        Twisted log observer.
+
+        :param event: <dict> log event
+        :return: <void>
+        """
+        logLevel = event.get("log_level")
+        if self._isSampledOut(logLevel.name if logLevel is not None else "info"):
+            return
+
+        self._enqueue(event)
+
+    def logAccess(self, accessEvent):
+        """
+        Log an HTTP access event.
+
+        :param accessEvent: <dict> JSON serializable access details
+        :return: <void>
+        """
+        self.logRecord("access", accessEvent)
+
+    def logRecord(self, recordType, record):
+        """
+        Log a structured record, sampled by its type.
+
+        :param recordType: <str> record type
+        :param record: <dict> JSON serializable record, timestamped when logged unless it has a time
+        :return: <void>
+        """
+        if self._isSampledOut(recordType):
+            return
+
+        record["type"] = recordType
+        record.setdefault("time", time())
+        self._enqueue(record)
+
+    def _encode(self, entry):
+        """
+        Encode a queued entry as a JSON line.
+
+        :param entry: <dict> Twisted log event or structured record
+        :return: <str>
+        """
+        # Twisted log events are timestamped by the log publisher
+        if "log_time" not in entry:
+            record = dict(entry)
+        else:
+            logLevel = entry.get("log_level")
+            record = {
+                "type": "log",
+                "time": entry.get("log_time", time()),
+                "level": logLevel.name if logLevel is not None else "info",
+                "namespace": entry.get("log_namespace"),
+                "message": formatEvent(entry)
+            }
+
+            if "log_failure" in entry:
+                record["failure"] = entry["log_failure"].getTraceback()
+
+        record["time"] = datetime.fromtimestamp(record["time"], timezone.utc).isoformat()
+
+        return json.dumps(record, default=str) + "\n"
+
+    def _writeEntries(self, entries, blocking=True):
+        """
+        Write entries to the log file.
+
+        :param entries: <list> Twisted log events and structured records
+        :param blocking: <bool> wait for the writer thread to release the log file, otherwise the entries are dropped
+            while it is being written
+        :return: <void>
+        """
+        if not self._logFileLock.acquire(blocking):
+            self.droppedCount += len(entries)
+            return
+
+        try:
+            self._writeLines(entries)
+        finally:
+            self._logFileLock.release()
+
+    def _writeLines(self, entries):
+        lines = []
+        for entry in entries:
+            try:
+                lines.append(self._encode(entry))
+            except Exception as e:
+                lines.append(json.dumps({"type": "log", "level": "error", "message": "Cannot encode log event.",
+                                         "error": str(e)}) + "\n")
+
+        # reporting the lost events
+        counters = (self.droppedCount, self.sampledOutCount)
+        if counters != self._reportedCounters:
+            self._reportedCounters = counters
+            lines.append(json.dumps({
+                "type": "pipeline",
+                "time": datetime.now(timezone.utc).isoformat(),
+                "droppedCount": counters[0],
+                "sampledOutCount": counters[1]
+            }) + "\n")
+
+        if len(lines) == 0:
+            return
+
+        self._logFile.write("".join(lines))
+        self._logFile.flush()
+        self.writtenCount += len(entries)
+
+    def _write(self):
+        """
+        Writer thread, writing the queued events in batches.
+
+        :return: <void>
+        """
+        batchSize = int(self.config["batchSize"])
+        flushInterval = float(self.config["flushInterval"])
+
+        stopping = False
+        while not stopping:
+            try:
+                entries = [self._queue.get(timeout=flushInterval)]
+            except queue.Empty:
+                entries = []
+
+            while len(entries) < batchSize:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if any(entry is self.kStop for entry in entries):
+                entries = [entry for entry in entries if entry is not self.kStop]
+                stopping = True
+            elif self._stopRequested.is_set():
+                stopping = True
+
+            try:
+                self._writeEntries(entries)
+            except Exception:
+                # the log file cannot be written, the events are lost
+                self.droppedCount += len(entries)
@@ -1,9 +1,11 @@
+import zlib
 import datetime
+from calendar import timegm
 
-from nx.viper.controller import Controller as ViperController
+from application.controller import Controller as BaseController
 
 
-class Controller(ViperController):
+class Controller(BaseController):
     """
     Basic CRUD example.
 
@@ -12,15 +14,45 @@ class Controller(ViperController):
     * responding successfully
     * handling failures
     """
-
-    def preDispatch(self):
+    dependencies = {
+        "articleModel": ("model", "default.article"),
+        "nestedService": ("service", "default.nestedService")
+    }
+
+    # input validation performed by the dispatcher before the controller is instantiated
+    parameterSchema = {
+        "create": {
+            "title": {"type": str, "maximumLength": 128}
+        },
+        "get": {
+            "article_id": {"type": int}
+        },
+        "update": {
+            "article_id": {"type": int},
+            "title": {"type": str, "maximumLength": 128}
+        },
+        "delete": {
+            "article_id": {"type": int}
+        },
+        "search": {
+            "query": {"type": str, "maximumLength": 128},
+            "page": {"type": int, "required": False},
+            "limit": {"type": int, "required": False}
+        }
+    }
+
+    def _getArticleETag(self, article):
         """
-        Optional method called before the action is dispatched.
+        Return the ETag of an article, derived from its ID, date and title without serializing it.
 
-        :return: <void>
+        :param article: <dict> article
+        :return: <str>
         """
-        self.articleModel = self.application.getModel("default.article")
-        self.nestedService = self.application.getService("default.nestedService")
+        return "\"{}-{}-{:08x}\"".format(
+            article["article_id"],
+            timegm(article["date"].utctimetuple()),
+            zlib.crc32(article["title"].encode())
+        )
 
     def createAction(self):
         """
@@ -28,22 +60,6 @@ class Controller(ViperController):
 
         :return: <void>
         """
-        # performing input validation
-        isValid = True
-        if "title" not in self.requestParameters:
-            isValid = False
-            self.responseErrors.append("title.IsEmpty")
-        elif not isinstance(self.requestParameters["title"], str):
-            isValid = False
-            self.responseErrors.append("title.NotString")
-
-        # fail request if validation failed, and output errors
-        if not isValid:
-            self.responseCode = 400
-            self.responseContent = None
-            self.sendFinalResponse()
-            return
-
         # define success and fail callbacks
         def successCallback(articleID):
             self.responseCode = 200
@@ -78,26 +94,19 @@ class Controller(ViperController):
 
         :return: <void>
         """
-        isValid = True
-        if "article_id" not in self.requestParameters:
-            isValid = False
-            self.responseErrors.append("article_id.IsEmpty")
-        elif not isinstance(self.requestParameters["article_id"], int):
-            isValid = False
-            self.responseErrors.append("article_id.NotInt")
-
-        if not isValid:
-            self.responseCode = 400
-            self.responseContent = None
-            self.sendFinalResponse()
-            return
-
         def successCallback(article):
+            # responding without content if the client already has the article
+            if self.requestProtocol.setResponseETag(self._getArticleETag(article)):
+                self.responseCode = 304
+                self.responseContent = None
+                self.sendFinalResponse()
+                return
+
             self.responseCode = 200
             self.responseContent["article"] = {
                 "article_id": article["article_id"],
                 "title": article["title"],
-                "date": article["date"].strftime("%Y-%m-%d %H:%M:%S")
+                "date": article["date"]
             }
             self.sendFinalResponse()
 
@@ -118,28 +127,6 @@ class Controller(ViperController):
 
         :return: <void>
         """
-        # performing input validation
-        isValid = True
-        if "article_id" not in self.requestParameters:
-            isValid = False
-            self.responseErrors.append("article_id.IsEmpty")
-        elif not isinstance(self.requestParameters["article_id"], int):
-            isValid = False
-            self.responseErrors.append("article_id.NotInt")
-
-        if "title" not in self.requestParameters:
-            isValid = False
-            self.responseErrors.append("title.IsEmpty")
-        elif not isinstance(self.requestParameters["title"], str):
-            isValid = False
-            self.responseErrors.append("title.NotString")
-
-        if not isValid:
-            self.responseCode = 400
-            self.responseContent = None
-            self.sendFinalResponse()
-            return
-
         def successCallback():
             self.responseCode = 200
             self.sendFinalResponse()
@@ -170,20 +157,6 @@ class Controller(ViperController):
 
         :return:
         """
-        isValid = True
-        if "article_id" not in self.requestParameters:
-            isValid = False
-            self.responseErrors.append("article_id.IsEmpty")
-        elif not isinstance(self.requestParameters["article_id"], int):
-            isValid = False
-            self.responseErrors.append("article_id.NotInt")
-
-        if not isValid:
-            self.responseCode = 400
-            self.responseContent = None
-            self.sendFinalResponse()
-            return
-
         def successCallback():
             self.responseCode = 200
             self.sendFinalResponse()
@@ -207,6 +180,54 @@ class Controller(ViperController):
             failCallback
         )
 
+    def searchAction(self):
+        """
+        Search articles by title, most recent first.
+
+        :return: <void>
+        """
+        def successCallback(articles, hasMore):
+            self.responseCode = 200
+            self.responseContent["articles"] = [
+                {
+                    "article_id": article["article_id"],
+                    "title": article["title"],
+                    "date": article["date"]
+                }
+                for article in articles
+            ]
+            self.responseContent["page"] = page
+            self.responseContent["limit"] = limit
+            self.responseContent["hasMore"] = hasMore
+            self.sendFinalResponse()
+
+        def failCallback(errors):
+            self.responseCode = 400
+            self.responseErrors.extend(errors)
+            self.sendFinalResponse()
+
+        searchConfig = self.application.config["articleSearch"]
+        page = self.requestParameters.get("page", 1)
+        limit = self.requestParameters.get("limit", searchConfig["defaultLimit"])
+
+        if limit < 1 or limit > searchConfig["maximumLimit"]:
+            failCallback(["limit.OutOfRange"])
+            return
+
+        # deep pages are rejected, their cost grows with the offset
+        offset = (page - 1) * limit
+        if page < 1 or offset > searchConfig["maximumOffset"]:
+            failCallback(["page.OutOfRange"])
+            return
+
+        self.articleModel.search(
+            self.requestParameters["query"],
+            offset,
+            limit,
+            successCallback,
+            failCallback
+        )
+
     def postDispatch(self):
         """
         Optional method called after the action is dispatched.
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+
+class CronSchedule:
+    """
+    Cron schedule
+
+    Parses a five field cron expression (minute, hour, day of month, month, day of week) and computes the next
+    matching time. Each field supports "*", single values, ranges ("1-5"), lists ("1,15,30") and steps ("*/5").
+    Day of week uses 0 (or 7) for Sunday.
+    """
+
+    kFieldRanges = (
+        (0, 59),
+        (0, 23),
+        (1, 31),
+        (1, 12),
+        (0, 7)
+    )
+
+    def __init__(self, expression):
+        """
+        :param expression: <str> cron expression
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("[Default.Scheduler]: Invalid cron expression \"{}\".".format(expression))
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parseField(field, minimum, maximum, expression)
+            for field, (minimum, maximum) in zip(fields, self.kFieldRanges)
+        ]
+
+        # Sunday can be specified as both 0 and 7
+        if 7 in self.weekdays:
+            self.weekdays = self.weekdays | {0}
+
+        self._restrictedDays = fields[2] != "*"
+        self._restrictedWeekdays = fields[4] != "*"
+
+        # rejecting impossible dates such as February 30th, getNextTime() raising ValueError if none matches
+        self.getNextTime(datetime.utcnow())
+
+    @staticmethod
+    def _parseField(field, minimum, maximum, expression):
+        """
+        Parse a single cron field into the set of allowed values.
+
+        :param field: <str> field value
+        :param minimum: <int> lowest allowed value
+        :param maximum: <int> highest allowed value
+        :param expression: <str> full expression used for error reporting
+        :return: <frozenset>
+        """
+        values = set()
+
+        try:
+            for item in field.split(","):
+                step = 1
+                if "/" in item:
+                    item, step = item.split("/", 1)
+                    step = int(step)
+                    if step <= 0:
+                        raise ValueError()
+
+                if item == "*":
+                    start, end = minimum, maximum
+                elif "-" in item:
+                    start, end = [int(value) for value in item.split("-", 1)]
+                else:
+                    start = int(item)
+                    end = maximum if step > 1 else start
+
+                if start < minimum or end > maximum or start > end:
+                    raise ValueError()
+
+                values.update(range(start, end + 1, step))
+        except ValueError:
+            raise ValueError("[Default.Scheduler]: Invalid cron expression \"{}\".".format(expression))
+
+        return frozenset(values)
+
+    def _matchesDay(self, time):
+        weekday = (time.weekday() + 1) % 7
+
+        # standard cron behaviour: when both day fields are restricted either of them can match
+        if self._restrictedDays and self._restrictedWeekdays:
+            return time.day in self.days or weekday in self.weekdays
+
+        return time.day in self.days and weekday in self.weekdays
+
+    def getNextTime(self, after):
+        """
+        Return the first time matching the schedule strictly after the given time.
+
+        :param after: <datetime> reference time
+        :return: <datetime>
+        """
+        time = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = time + timedelta(days=366 * 5)
+
+        while time < limit:
+            if time.month not in self.months:
+                time = (time.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+
+            if not self._matchesDay(time):
+                time = time.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            if time.hour not in self.hours:
+                time = time.replace(minute=0) + timedelta(hours=1)
+                continue
+
+            if time.minute not in self.minutes:
+                time = time + timedelta(minutes=1)
+                continue
+
+            return time
+
+        raise ValueError("[Default.Scheduler]: Cron expression \"{}\" never matches.".format(self.expression))
@@ -0,0 +1,153 @@
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+kWordPattern = re.compile(r"\w+")
+
+
+def getTerms(text, minimumLength, maximumCount=None):
+    """
+    Split a text into distinct lowercase words, in order of appearance.
+
+    :param text: <str> text
+    :param minimumLength: <int> minimum word length, shorter words are ignored
+    :param maximumCount: <int> optional, maximum number of words returned
+    :return: <list>
+    """
+    terms = []
+    for term in kWordPattern.findall(text.lower()):
+        if len(term) < minimumLength or term in terms:
+            continue
+
+        terms.append(term)
+        if maximumCount is not None and len(terms) == maximumCount:
+            break
+
+    return terms
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index of document titles.
+
+    Each term maps to the sorted array of the IDs of the documents containing it. Searches return the IDs of the
+    documents containing all the terms, most recent (highest ID) first, and stop as soon as the requested page is
+    complete. The terms of each document are kept to remove its postings when it is updated or deleted.
+    """
+
+    def __init__(self, minimumLength):
+        """
+        :param minimumLength: <int> minimum indexed word length
+        """
+        self.minimumLength = minimumLength
+
+        self._postings = {}
+        self._documentTerms = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documentTerms)
+
+    def _add(self, documentID, title):
+        # sharing the term strings between documents
+        terms = tuple(sys.intern(term) for term in getTerms(title, self.minimumLength))
+
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = array("q")
+
+            # documents are mostly added in ID order
+            if len(postings) == 0 or postings[-1] < documentID:
+                postings.append(documentID)
+            else:
+                insort(postings, documentID)
+
+        self._documentTerms[documentID] = terms
+
+    def _remove(self, documentID):
+        terms = self._documentTerms.pop(documentID, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            index = bisect_left(postings, documentID)
+            if index < len(postings) and postings[index] == documentID:
+                del postings[index]
+
+            if len(postings) == 0:
+                del self._postings[term]
+
+    def add(self, documentID, title):
+        """
+        Index a document, replacing its previous title if it is already indexed.
+
+        :param documentID: <int> document ID
+        :param title: <str> document title
+        :return: <void>
+        """
+        with self._lock:
+            self._remove(documentID)
+            self._add(documentID, title)
+
+    def remove(self, documentID):
+        """
+        Remove a document from the index.
+
+        :param documentID: <int> document ID
+        :return: <void>
+        """
+        with self._lock:
+            self._remove(documentID)
+
+    def search(self, terms, offset, limit):
+        """
+        Find the documents containing all the terms.
+
+        :param terms: <list> terms, as returned by getTerms()
+        :param offset: <int> number of matching documents skipped
+        :param limit: <int> maximum number of document IDs returned
+        :return: <tuple> list of document IDs, most recent first, and whether more documents match
+        """
+        if len(terms) == 0:
+            return [], False
+
+        with self._lock:
+            postingsList = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    return [], False
+                postingsList.append(postings)
+
+            # iterating the rarest term, looking the others up
+            postingsList.sort(key=len)
+            candidates = postingsList[0]
+            others = postingsList[1:]
+            wanted = offset + limit + 1
+
+            if len(others) == 0:
+                end = max(len(candidates) - offset, 0)
+                start = max(end - limit - 1, 0)
+                matches = candidates[start:end].tolist()
+                matches.reverse()
+                return matches[:limit], len(matches) > limit
+
+            matches = []
+            for index in range(len(candidates) - 1, -1, -1):
+                documentID = candidates[index]
+
+                for postings in others:
+                    position = bisect_left(postings, documentID)
+                    if position == len(postings) or postings[position] != documentID:
+                        break
+                else:
+                    matches.append(documentID)
+                    if len(matches) == wanted:
+                        break
+
+            matches = matches[offset:]
+            return matches[:limit], len(matches) > limit
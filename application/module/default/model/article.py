@@ -1,17 +1,92 @@
+import threading
 from datetime import datetime
 
 from twisted.logger import Logger
 from twisted.internet import reactor
 from twisted.python.failure import Failure
 
+from application.events import kEventResponseCacheInvalidate, kEventArticleIndexUpdate
+from application.module.default.library.invertedIndex import getTerms
+
 
 class Model:
+    """
+    Article model.
+
+    Concurrent get() calls with the same predicate share a single query: the first call issues it and the following
+    ones wait for its result instead of issuing their own.
+
+    Title searches use the MySQL FULLTEXT index of article_article.title, or the default.articleIndex service when
+    articleSearch.fullText is disabled.
+    """
     log = Logger()
 
     def __init__(self, application):
         self.application = application
         self.dbService = self.application.getService("viper.mysql")
 
+        # looked up on first use, the services are loaded after the models
+        self.articleIndexService = None
+
+        # handlers waiting for the result of an in-flight select, by query
+        self._pendingGets = {}
+        self._pendingGetsLock = threading.Lock()
+
+        self.issuedQueryCount = 0
+        self.collapsedQueryCount = 0
+
+    def getMetrics(self):
+        """
+        Return the query coalescing metrics.
+
+        :return: <dict>
+        """
+        return {
+            "issuedQueryCount": self.issuedQueryCount,
+            "collapsedQueryCount": self.collapsedQueryCount,
+            "pendingQueryCount": len(self._pendingGets)
+        }
+
+    def _getPredicateArticleID(self, predicate):
+        """
+        Return the ID of the article selected by a predicate.
+
+        :param predicate: <tuple> condition consisting of: column name, relation, value
+        :return: <int> article ID, None if the predicate may select other articles
+        """
+        if predicate[0] == "article_id" and predicate[1] == "=" and isinstance(predicate[2], int):
+            return predicate[2]
+
+        return None
+
+    def _articlesWritten(self):
+        """
+        Method called after every write. Reads in-flight may return data from before the write, so later get() calls
+        no longer wait for them, and the cached responses built from articles are removed.
+
+        :return: <void>
+        """
+        with self._pendingGetsLock:
+            self._pendingGets.clear()
+
+        self.application.eventDispatcher.dispatch(
+            {"tags": ["default.article"]},
+            kEventResponseCacheInvalidate
+        )
+
+    def _titleWritten(self, articleID, title):
+        """
+        Method called after a write changing titles, updating the title index.
+
+        :param articleID: <int> written article's ID, None if unknown
+        :param title: <str> article's new title, None if the article was deleted
+        :return: <void>
+        """
+        self.application.eventDispatcher.dispatch(
+            {"article_id": articleID, "title": title},
+            kEventArticleIndexUpdate
+        )
+
     def get(self, predicate, successHandler, failHandler=None):
         """
         Fetch article from persistent storage.
@@ -38,6 +113,26 @@ class Model:
         else:
             querySelectParams.append(predicate[2])
 
+        # waiting for an identical select already in-flight
+        queryKey = (querySelect, tuple(querySelectParams))
+        with self._pendingGetsLock:
+            handlers = self._pendingGets.get(queryKey)
+            if handlers is not None:
+                handlers.append((successHandler, failHandler))
+                self.collapsedQueryCount += 1
+                return
+
+            handlers = [(successHandler, failHandler)]
+            self._pendingGets[queryKey] = handlers
+            self.issuedQueryCount += 1
+
+        def popHandlers():
+            with self._pendingGetsLock:
+                if self._pendingGets.get(queryKey) is handlers:
+                    del self._pendingGets[queryKey]
+
+            return handlers
+
         def failCallback(error):
             errorMessage = str(error)
             if isinstance(error, Failure):
@@ -48,20 +143,24 @@ class Model:
                 errorMessage=errorMessage
             )
 
-            if failHandler is not None:
-                reactor.callInThread(failHandler, ["DatabaseError"])
+            for _, handlerFail in popHandlers():
+                if handlerFail is not None:
+                    reactor.callInThread(handlerFail, ["DatabaseError"])
 
         def successCallback(results):
-            if len(results) == 0 and failHandler is not None:
-                reactor.callInThread(failHandler, ["ArticleNotFound"])
-                return
-
-            reactor.callInThread(successHandler, {
-                "article_id": results[0][0],
-                "title": results[0][1],
-                "date": results[0][2],
-                "ip": results[0][3]
-            })
+            for handlerSuccess, handlerFail in popHandlers():
+                if len(results) == 0:
+                    if handlerFail is not None:
+                        reactor.callInThread(handlerFail, ["ArticleNotFound"])
+                    continue
+
+                # each handler receives its own article
+                reactor.callInThread(handlerSuccess, {
+                    "article_id": results[0][0],
+                    "title": results[0][1],
+                    "date": results[0][2],
+                    "ip": results[0][3]
+                })
 
         operation = self.dbService.runQuery(
             querySelect,
@@ -69,6 +168,95 @@ class Model:
         )
         operation.addCallbacks(successCallback, failCallback)
 
+    def search(self, query, offset, limit, successHandler, failHandler=None):
+        """
+        Find the articles whose titles contain all the words of a query, most recent first.
+
+        :param query: <str> searched words, words shorter than articleSearch.minimumWordLength are ignored
+        :param offset: <int> number of matching articles skipped
+        :param limit: <int> maximum number of articles returned
+        :param successHandler: <function(<list>, <bool>)> method called if action is completed successfully where the
+                                first argument is the list of articles and the second whether more articles match
+        :param failHandler: <function(<list>)> method called if action fails where the first argument is a list of
+                            error messages
+        :return: <void>
+        """
+        searchConfig = self.application.config["articleSearch"]
+        terms = getTerms(query, int(searchConfig["minimumWordLength"]), int(searchConfig["maximumTerms"]))
+        if len(terms) == 0:
+            if failHandler is not None:
+                reactor.callInThread(failHandler, ["QueryTooShort"])
+            return
+
+        def failCallback(error):
+            errorMessage = str(error)
+            if isinstance(error, Failure):
+                errorMessage = error.getErrorMessage()
+
+            self.log.error(
+                "[Default.Article] search() database error: {errorMessage}",
+                errorMessage=errorMessage
+            )
+
+            if failHandler is not None:
+                reactor.callInThread(failHandler, ["DatabaseError"])
+
+        def getArticles(results):
+            return [
+                {
+                    "article_id": result[0],
+                    "title": result[1],
+                    "date": result[2]
+                }
+                for result in results
+            ]
+
+        if searchConfig["fullText"]:
+            def fullTextCallback(results):
+                reactor.callInThread(successHandler, getArticles(results[:limit]), len(results) > limit)
+
+            # every word is required, one more article is read to know if there are more results
+            operation = self.dbService.runQuery(
+                "SELECT `article_id`, `title`, `date` "
+                "FROM `article_article` "
+                "WHERE MATCH (`title`) AGAINST (%s IN BOOLEAN MODE) "
+                "ORDER BY `article_id` DESC "
+                "LIMIT %s OFFSET %s;",
+                (" ".join("+{}".format(term) for term in terms), limit + 1, offset)
+            )
+            operation.addCallbacks(fullTextCallback, failCallback)
+            return
+
+        if self.articleIndexService is None:
+            self.articleIndexService = self.application.getService("default.articleIndex")
+
+        if not self.articleIndexService.isReady():
+            if failHandler is not None:
+                reactor.callInThread(failHandler, ["SearchUnavailable"])
+            return
+
+        articleIDs, hasMore = self.articleIndexService.search(terms, offset, limit)
+        if len(articleIDs) == 0:
+            reactor.callInThread(successHandler, [], hasMore)
+            return
+
+        def indexCallback(results):
+            # keeping the index order, articles deleted meanwhile are skipped
+            articles = {article["article_id"]: article for article in getArticles(results)}
+            reactor.callInThread(
+                successHandler,
+                [articles[articleID] for articleID in articleIDs if articleID in articles],
+                hasMore
+            )
+
+        operation = self.dbService.runQuery(
+            "SELECT `article_id`, `title`, `date` "
+            "FROM `article_article` "
+            "WHERE `article_id` IN ({});".format(", ".join(["%s"] * len(articleIDs))),
+            tuple(articleIDs)
+        )
+        operation.addCallbacks(indexCallback, failCallback)
+
     def create(self, successHandler=None, failHandler=None, **kwargs):
         """
         Create a new article in persistent storage.
@@ -94,7 +282,7 @@ class Model:
             if failHandler is not None:
                 reactor.callInThread(failHandler, ["DatabaseError"])
 
-        def createCallback(transaction, successHandler, **kwargs):
+        def createCallback(transaction, **kwargs):
             # create query
             queryInsert = "INSERT INTO `article_article` ("
             if len(kwargs) > 0:
@@ -106,8 +294,7 @@ class Model:
                         queryInsert = "{}, ".format(queryInsert)
                     count += 1
             else:
-                failCallback("No kwargs specified.")
-                return
+                raise ValueError("No kwargs specified.")
 
             # add parameters from kwargs
             queryInsert = "{}) VALUES (".format(queryInsert)
@@ -127,31 +314,35 @@ class Model:
             # finishing the query
             queryInsert = "{});".format(queryInsert)
 
-            try:
-                # executing insert
-                transaction.execute(
-                    queryInsert,
-                    tuple(queryInsertParams)
-                )
-
-                # getting newly inserted article ID
-                articleID = None
-                transaction.execute(
-                    "SELECT LAST_INSERT_ID() FROM article_article LIMIT 1;"
-                )
-                results = list(transaction.fetchall())
-
-                if len(results) == 1 and len(results[0]) and isinstance(results[0][0], int):
-                    articleID = results[0][0]
-            except Exception as e:
-                failCallback(e)
-                return
+            # executing insert, errors are handled by failCallback
+            transaction.execute(
+                queryInsert,
+                tuple(queryInsertParams)
+            )
+
+            # getting newly inserted article ID
+            articleID = None
+            transaction.execute(
+                "SELECT LAST_INSERT_ID() FROM article_article LIMIT 1;"
+            )
+            results = list(transaction.fetchall())
+
+            if len(results) == 1 and len(results[0]) and isinstance(results[0][0], int):
+                articleID = results[0][0]
+
+            return articleID
+
+        def successCallback(articleID):
+            # the cached responses are removed before the client is answered
+            self._articlesWritten()
+            if articleID is not None and "title" in kwargs:
+                self._titleWritten(articleID, kwargs["title"])
 
             if successHandler is not None:
                 reactor.callInThread(successHandler, articleID)
 
-        interaction = self.dbService.runInteraction(createCallback, successHandler, **kwargs)
-        interaction.addErrback(failCallback)
+        interaction = self.dbService.runInteraction(createCallback, **kwargs)
+        interaction.addCallbacks(successCallback, failCallback)
 
     def update(self, predicate, successHandler=None, failHandler=None, **kwargs):
         """
@@ -204,6 +395,10 @@ class Model:
                 reactor.callInThread(failHandler, ["DatabaseError"])
 
         def successCallback(results):
+            self._articlesWritten()
+            if "title" in kwargs:
+                self._titleWritten(self._getPredicateArticleID(predicate), kwargs["title"])
+
             if successHandler is not None:
                 reactor.callInThread(successHandler)
 
@@ -249,6 +444,9 @@ class Model:
                 reactor.callInThread(failHandler, ["DatabaseError"])
 
         def successCallback(results):
+            self._articlesWritten()
+            self._titleWritten(self._getPredicateArticleID(predicate), None)
+
             if successHandler is not None:
                 reactor.callInThread(successHandler)
 
@@ -1,6 +1,6 @@
-from nx.viper.module import Module as ViperModule
+from application.startup import LazyModule
 
 
-class Module(ViperModule):
+class Module(LazyModule):
     def __init__(self, application):
         super(Module, self).__init__("default", __file__, application)
@@ -0,0 +1,192 @@
+from time import perf_counter
+
+from twisted.logger import Logger
+from twisted.python.failure import Failure
+
+from nx.viper.application import Application
+
+from application.events import kEventArticleIndexUpdate
+from application.module.default.library.invertedIndex import InvertedIndex
+
+
+class Service:
+    """
+    Article title index
+
+    In-process inverted index of the article titles, used for searches when the database has no FULLTEXT index
+    (articleSearch.fullText disabled). The index is built from the database when the application starts and kept up
+    to date by the article model, which dispatches application.events.kEventArticleIndexUpdate after every write.
+    Writes whose articles are unknown trigger a rebuild.
+    """
+    log = Logger()
+
+    # loaded at startup even with lazy loading, the index being built once the application starts
+    eager = True
+
+    def __init__(self, application):
+        self.application = application
+
+        self.enabled = False
+        self.index = None
+
+        self._building = False
+        self._rebuildRequested = False
+        self._pendingUpdates = []
+
+        # running after the database service created its connection pool
+        self.application.eventDispatcher.addObserver(
+            Application.kEventApplicationStart,
+            self._applicationStart,
+            -100
+        )
+
+        self.application.eventDispatcher.addObserver(
+            kEventArticleIndexUpdate,
+            self._update
+        )
+
+    def _applicationStart(self, data):
+        """
+        Method called when application completed startup process.
+        Builds the index if searches are not performed by the database.
+
+        :param data: <object> event data object
+        :return: <void>
+        """
+        searchConfig = self.application.config["articleSearch"]
+        if searchConfig["fullText"]:
+            return
+
+        mysqlConfig = self.application.config.get("viper.mysql", {})
+        if len(mysqlConfig.get("host", "")) == 0 or len(mysqlConfig.get("name", "")) == 0:
+            return
+
+        self.enabled = True
+        self.minimumWordLength = int(searchConfig["minimumWordLength"])
+        self.batchSize = int(searchConfig["indexBatchSize"])
+
+        self.rebuild()
+
+    def isReady(self):
+        """
+        Return whether searches can be performed.
+
+        :return: <bool>
+        """
+        return self.index is not None
+
+    def search(self, terms, offset, limit):
+        """
+        Find the articles whose titles contain all the terms.
+
+        :param terms: <list> terms, as returned by invertedIndex.getTerms()
+        :param offset: <int> number of matching articles skipped
+        :param limit: <int> maximum number of article IDs returned
+        :return: <tuple> list of article IDs, most recent first, and whether more articles match
+        """
+        return self.index.search(terms, offset, limit)
+
+    def rebuild(self):
+        """
+        Build a new index from the database in background, replacing the current one once completed.
+
+        :return: <void>
+        """
+        if not self.enabled:
+            return
+
+        if self._building:
+            self._rebuildRequested = True
+            return
+
+        self._building = True
+        self._pendingUpdates = []
+        buildStart = perf_counter()
+
+        def buildCallback(transaction):
+            index = InvertedIndex(self.minimumWordLength)
+
+            # reading the articles in batches to bound the memory used by the results
+            lastArticleID = 0
+            while True:
+                transaction.execute(
+                    "SELECT `article_id`, `title` "
+                    "FROM `article_article` "
+                    "WHERE `article_id` > %s "
+                    "ORDER BY `article_id` "
+                    "LIMIT %s;",
+                    (lastArticleID, self.batchSize)
+                )
+                results = transaction.fetchall()
+                for articleID, title in results:
+                    index.add(articleID, title)
+
+                if len(results) < self.batchSize:
+                    return index
+
+                lastArticleID = results[-1][0]
+
+        def successCallback(index):
+            # applying the writes performed while building
+            for update in self._pendingUpdates:
+                self._applyUpdate(index, update)
+
+            self.index = index
+            self._buildCompleted()
+
+            self.log.info(
+                "[Default.ArticleIndex] Indexed {count} articles in {duration:.2f} s.",
+                count=len(index),
+                duration=perf_counter() - buildStart
+            )
+
+        def failCallback(error):
+            errorMessage = str(error)
+            if isinstance(error, Failure):
+                errorMessage = error.getErrorMessage()
+
+            self.log.error(
+                "[Default.ArticleIndex] rebuild() database error: {errorMessage}",
+                errorMessage=errorMessage
+            )
+
+            self._buildCompleted()
+
+        interaction = self.application.getService("viper.mysql").runInteraction(buildCallback)
+        interaction.addCallbacks(successCallback, failCallback)
+
+    def _buildCompleted(self):
+        self._building = False
+        self._pendingUpdates = []
+
+        if self._rebuildRequested:
+            self._rebuildRequested = False
+            self.rebuild()
+
+    def _applyUpdate(self, index, update):
+        if update["title"] is None:
+            index.remove(update["article_id"])
+        else:
+            index.add(update["article_id"], update["title"])
+
+    def _update(self, data):
+        """
+        Method called after an article write.
+
+        :param data: <dict> event data object
+            :param article_id: <int> written article's ID, None if unknown
+            :param title: <str> article's new title, None if the article was deleted
+        :return: <void>
+        """
+        if not self.enabled:
+            return
+
+        if data["article_id"] is None:
+            self.rebuild()
+            return
+
+        if self._building:
+            self._pendingUpdates.append(data)
+
+        if self.index is not None:
+            self._applyUpdate(self.index, data)
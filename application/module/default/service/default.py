@@ -1,8 +1,4 @@
-from time import sleep
-
 from twisted.logger import Logger
-from twisted.internet import reactor
-from twisted.internet.task import LoopingCall
 
 from nx.viper.application import Application
 
@@ -10,6 +6,9 @@ from nx.viper.application import Application
 class Service:
     log = Logger()
 
+    # loaded at startup even with lazy loading, the recurring job being added once the application starts
+    eager = True
+
     def __init__(self, application):
         self.application = application
 
@@ -19,12 +18,6 @@ class Service:
             self._applicationStart
         )
 
-        # binding method to run when the application is asked to close
-        self.application.eventDispatcher.addObserver(
-            Application.kEventApplicationStop,
-            self._applicationStop
-        )
-
     def _applicationStart(self, data):
         """
         Method called when application completed startup process.
@@ -32,44 +25,36 @@ class Service:
         :param data: <object> event data object
         :return: <void>
         """
-        self.pendingApplicationShutdown = False
-
         self.articleModel = self.application.getModel("default.article")
-        self.mailService = self.application.getService("viper.mail")
-
-        # creating a action running on a background thread with a frequency of 60 seconds
-        self.recurringAction = LoopingCall(reactor.callInThread, self._recurringAction)
-        self.recurringAction.start(60 * 1, True)
-
-    def _applicationStop(self, data):
-        """
-        Method to run when the application is asked to close.
-
-        :param data: <object> event data object
-        :return: <void>
-        """
-        self.pendingApplicationShutdown = True
-
-        try:
-            if hasattr(self, "recurringAction") and self.recurringAction is not None:
-                self.recurringAction.stop()
-        except Exception:
-            pass
+        self.mailQueue = self.application.getService("default.mailQueue")
+        self.scheduler = self.application.getService("default.scheduler")
+
+        # creating an action running on the scheduler thread pool with a frequency of 60 seconds
+        self.scheduler.addJob(
+            "default.recurringAction",
+            self._recurringAction,
+            interval=60 * 1,
+            jitter=5,
+            runImmediately=True,
+            cancellable=True
+        )
 
-    def _recurringAction(self):
+    def _recurringAction(self, cancelled):
         """
-        Example of a time consuming recurring action.
+        Example of a recurring action.
 
+        :param cancelled: <threading.Event> set when the action should stop early
         :return: <void>
         """
-        # checking if an application shutdown is pending in order to prevent a time consuming task from running
-        if self.pendingApplicationShutdown:
+        # checking if the job was cancelled, e.g. by an application shutdown, in order to prevent a time consuming
+        # task from running
+        if cancelled.is_set():
             return
 
-        # performing time consuming task
-        sleep(2.5)
         self.log.debug("[Default.Default] Recurring action ran.")
-        sendMail = self.mailService.send(
+
+        # queueing the mail instead of sending it, delivery is performed by the mail queue worker
+        self.mailQueue.send(
             (
                 "admin@example.com",
             ),
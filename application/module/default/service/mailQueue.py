@@ -0,0 +1,411 @@
+import heapq
+import queue
+import smtplib
+import socket
+import threading
+from email.message import EmailMessage
+from email.utils import formataddr
+from time import monotonic
+
+from twisted.logger import Logger
+from twisted.internet import reactor, defer
+
+from nx.viper.application import Application
+
+
+class Service:
+    """
+    Asynchronous mail queue
+
+    Delivers mails queued by other services on a dedicated worker thread, keeping SMTP work away from the
+    reactor thread pool used by the interfaces.
+    The SMTP connection is reused across messages, queued messages are sent in batches over a single connection,
+    failed deliveries are retried with an exponential backoff and pending messages are drained on shutdown.
+    """
+    log = Logger()
+
+    # loaded at startup even with lazy loading, the worker thread being started with the application
+    eager = True
+
+    def __init__(self, application):
+        self.application = application
+
+        self.configured = False
+        self.sentCount = 0
+        self.failedCount = 0
+        self.droppedCount = 0
+
+        self._queue = None
+        self._worker = None
+        self._smtp = None
+        self._smtpLastUsed = 0
+        self._retries = []
+        self._retrySequence = 0
+        self._stopping = False
+        self._stopped = None
+
+        # binding method to run when application completed startup process
+        self.application.eventDispatcher.addObserver(
+            Application.kEventApplicationStart,
+            self._applicationStart
+        )
+
+        # binding method to run when the application is asked to close
+        self.application.eventDispatcher.addObserver(
+            Application.kEventApplicationStop,
+            self._applicationStop
+        )
+
+    def _applicationStart(self, data):
+        """
+        Method called when application completed startup process.
+        Starts the worker thread if the mail service is configured.
+
+        :param data: <object> event data object
+        :return: <void>
+        """
+        if "viper.mail" not in self.application.config:
+            return
+
+        mailConfig = self.application.config["viper.mail"]
+        if "host" not in mailConfig or "port" not in mailConfig:
+            return
+        if len(mailConfig["host"]) == 0 or mailConfig["port"] <= 0:
+            return
+
+        queueConfig = self.application.config.get("mailQueue", {})
+        self.queueSize = int(queueConfig.get("queueSize", 1000))
+        self.batchSize = int(queueConfig.get("batchSize", 20))
+        self.retryMaximum = int(queueConfig.get("retryMaximum", 5))
+        self.retryDelay = float(queueConfig.get("retryDelay", 5))
+        self.retryDelayMaximum = float(queueConfig.get("retryDelayMaximum", 300))
+        self.connectionIdleTimeout = float(queueConfig.get("connectionIdleTimeout", 30))
+        self.shutdownTimeout = float(queueConfig.get("shutdownTimeout", 10))
+
+        self.configured = True
+        self._queue = queue.Queue(self.queueSize)
+        self._stopped = defer.Deferred()
+
+        self._worker = threading.Thread(target=self._run, name="default.mailQueue")
+        self._worker.daemon = True
+        self._worker.start()
+
+        # delaying the reactor shutdown until the queue is drained
+        reactor.addSystemEventTrigger("before", "shutdown", self._drain)
+
+    def _applicationStop(self, data):
+        """
+        Method to run when the application is asked to close.
+
+        :param data: <object> event data object
+        :return: <void>
+        """
+        self._stop()
+
+    def _stop(self):
+        """
+        Ask the worker to deliver the remaining messages and exit.
+
+        :return: <void>
+        """
+        if self._worker is None or self._stopping:
+            return
+
+        self._stopping = True
+
+        # the worker is woken up by the sentinel, blocking is avoided since the reactor thread might be the caller
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _drain(self):
+        """
+        Wait for the worker to drain the queue, bounded by the configured shutdown timeout.
+
+        :return: <Deferred>
+        """
+        self._stop()
+
+        if self._stopped.called:
+            return None
+
+        def timeoutCallback():
+            if not self._stopped.called:
+                self.log.warn(
+                    "[Default.MailQueue] Shutdown timeout reached with {count} messages still queued.",
+                    count=self._queue.qsize() + len(self._retries)
+                )
+                self._stopped.callback(None)
+
+        timeoutCall = reactor.callLater(self.shutdownTimeout, timeoutCallback)
+
+        def stoppedCallback(result):
+            if timeoutCall.active():
+                timeoutCall.cancel()
+            return result
+
+        self._stopped.addCallback(stoppedCallback)
+        return self._stopped
+
+    def send(self, recipient, subject, message):
+        """
+        Queue an email for delivery.
+
+        :param recipient: <tuple> recipient's email address as the first element and their name as an optional second
+                            element
+        :param subject: <str> mail subject
+        :param message: <str> mail content (as HTML markup)
+        :return: <bool> True if mail was queued successfully, False otherwise
+        """
+        if self.configured is False or self._stopping:
+            return False
+
+        try:
+            self._queue.put_nowait({
+                "recipient": recipient,
+                "subject": subject,
+                "message": message,
+                "attempts": 0
+            })
+        except queue.Full:
+            self.droppedCount += 1
+            self.log.warn(
+                "[Default.MailQueue] Queue is full, dropping mail for {recipient}.",
+                recipient=recipient[0]
+            )
+            return False
+
+        return True
+
+    #
+    # Worker
+    #
+    def _run(self):
+        """
+        Worker thread loop.
+
+        :return: <void>
+        """
+        try:
+            while True:
+                batch = self._collectBatch()
+                if batch is None:
+                    break
+
+                if len(batch) > 0:
+                    self._deliverBatch(batch)
+                elif self._smtp is not None \
+                        and monotonic() - self._smtpLastUsed >= self.connectionIdleTimeout:
+                    self._disconnect()
+        except Exception as e:
+            # mails are no longer accepted since nothing would deliver them
+            self.configured = False
+            self.log.error("[Default.MailQueue] Worker stopped unexpectedly. Error: {error}", error=str(e))
+        finally:
+            self._disconnect()
+            reactor.callFromThread(self._workerStopped)
+
+    def _workerStopped(self):
+        if not self._stopped.called:
+            self._stopped.callback(None)
+
+    def _collectBatch(self):
+        """
+        Wait for queued messages or due retries and collect them into a batch.
+
+        :return: <list> messages to deliver, empty if nothing is due yet, None if the worker must exit
+        """
+        batch = []
+
+        if self._stopping:
+            # retries are due right away while draining
+            timeout = 0
+        elif len(self._retries) > 0:
+            timeout = max(0, self._retries[0][0] - monotonic())
+        else:
+            timeout = self.connectionIdleTimeout
+
+        try:
+            item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        except queue.Empty:
+            pass
+
+        while len(batch) < self.batchSize:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is not None:
+                batch.append(item)
+
+        now = monotonic()
+        while len(self._retries) > 0 and len(batch) < self.batchSize \
+                and (self._stopping or self._retries[0][0] <= now):
+            batch.append(heapq.heappop(self._retries)[2])
+
+        if len(batch) == 0 and self._stopping and len(self._retries) == 0 and self._queue.empty():
+            return None
+
+        return batch
+
+    def _deliverBatch(self, batch):
+        """
+        Deliver a batch of messages over a single SMTP connection.
+
+        :param batch: <list> messages
+        :return: <void>
+        """
+        for index, item in enumerate(batch):
+            if self._smtp is None and not self._connect():
+                for pendingItem in batch[index:]:
+                    self._retry(pendingItem, "connection failed")
+                return
+
+            self._deliver(item)
+
+    def _deliver(self, item):
+        """
+        Deliver a single message, reconnecting once if the reused connection was closed by the server. Messages
+        failing for any other reason are counted as failed without stopping the worker.
+
+        :param item: <dict> queued message
+        :return: <void>
+        """
+        try:
+            message = self._composeMessage(item)
+        except Exception as e:
+            self._fail(item, "Cannot compose mail", e)
+            return
+
+        for reconnect in (True, False):
+            try:
+                self._smtp.send_message(message)
+                self._smtpLastUsed = monotonic()
+                self.sentCount += 1
+                return
+            except smtplib.SMTPServerDisconnected as e:
+                self._disconnect()
+                if not reconnect or not self._connect():
+                    self._retry(item, str(e))
+                    return
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+                self._fail(item, "Server refused mail", e)
+                return
+            except (smtplib.SMTPException, socket.error) as e:
+                self._disconnect()
+                self._retry(item, str(e))
+                return
+            except Exception as e:
+                # the state of the connection is unknown
+                self._disconnect()
+                self._fail(item, "Cannot send mail", e)
+                return
+
+    def _fail(self, item, reason, error):
+        """
+        Count a message which cannot be delivered.
+
+        :param item: <dict> queued message
+        :param reason: <str> failure description
+        :param error: <Exception> failure cause
+        :return: <void>
+        """
+        self.failedCount += 1
+        self.log.warn(
+            "[Default.MailQueue] {reason} for {recipient}. Error: {error}",
+            reason=reason,
+            recipient=item["recipient"][0] if len(item["recipient"]) > 0 else None,
+            error=str(error)
+        )
+
+    def _retry(self, item, reason):
+        """
+        Schedule a message for redelivery using an exponential backoff.
+
+        :param item: <dict> queued message
+        :param reason: <str> failure reason
+        :return: <void>
+        """
+        item["attempts"] += 1
+
+        if item["attempts"] > self.retryMaximum or (self._stopping and item["attempts"] > 1):
+            self.failedCount += 1
+            self.log.warn(
+                "[Default.MailQueue] Giving up on mail for {recipient} after {attempts} attempts. Error: {error}",
+                recipient=item["recipient"][0],
+                attempts=item["attempts"],
+                error=reason
+            )
+            return
+
+        delay = min(self.retryDelay * (2 ** (item["attempts"] - 1)), self.retryDelayMaximum)
+        self._retrySequence += 1
+        heapq.heappush(self._retries, (monotonic() + delay, self._retrySequence, item))
+
+    def _connect(self):
+        """
+        Open and authenticate the SMTP connection.
+
+        :return: <bool> True if connected, False otherwise
+        """
+        mailConfig = self.application.config["viper.mail"]
+
+        try:
+            self._smtp = smtplib.SMTP(mailConfig["host"], mailConfig["port"])
+
+            if mailConfig["tls"]:
+                self._smtp.starttls()
+
+            if len(mailConfig["username"]) > 0:
+                self._smtp.login(mailConfig["username"], mailConfig["password"])
+        except Exception as e:
+            self._disconnect()
+            self.log.warn(
+                "[Default.MailQueue] Cannot connect to server. Error: {error}",
+                error=str(e)
+            )
+            return False
+
+        self._smtpLastUsed = monotonic()
+        return True
+
+    def _disconnect(self):
+        """
+        Close the SMTP connection if open.
+
+        :return: <void>
+        """
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+
+        self._smtp = None
+
+    def _composeMessage(self, item):
+        """
+        Create the email message for a queued item.
+
+        :param item: <dict> queued message
+        :return: <EmailMessage>
+        """
+        mailConfig = self.application.config["viper.mail"]
+        recipient = item["recipient"]
+
+        message = EmailMessage()
+        message["From"] = formataddr((mailConfig["name"], mailConfig["from"]))
+        if len(recipient) == 2:
+            message["To"] = formataddr((recipient[1], recipient[0]))
+        else:
+            message["To"] = recipient[0]
+        message["Subject"] = item["subject"]
+        message.set_content(item["message"], subtype="html")
+
+        return message
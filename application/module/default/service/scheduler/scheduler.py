@@ -0,0 +1,312 @@
+import random
+import threading
+from datetime import datetime
+from time import monotonic
+
+from twisted.logger import Logger
+from twisted.internet import reactor, defer
+from twisted.python.threadpool import ThreadPool
+
+from nx.viper.application import Application
+
+from application.module.default.library.cronSchedule import CronSchedule
+
+
+class Job:
+    """
+    Scheduled job state and run metrics.
+    """
+
+    def __init__(self, name, function, interval, cron, jitter, cancellable):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        self.cancellable = cancellable
+
+        self.call = None
+        self.running = False
+
+        # set when the job is removed or the application is asked to close
+        self.cancelled = threading.Event()
+
+        self.runCount = 0
+        self.failureCount = 0
+        self.skippedCount = 0
+        self.lastRunTime = None
+        self.lastDuration = 0.0
+        self.totalDuration = 0.0
+        self.maximumDuration = 0.0
+
+    def getMetrics(self):
+        """
+        Return the job run metrics.
+
+        :return: <dict>
+        """
+        return {
+            "running": self.running,
+            "runCount": self.runCount,
+            "failureCount": self.failureCount,
+            "skippedCount": self.skippedCount,
+            "lastRunTime": self.lastRunTime,
+            "lastDuration": self.lastDuration,
+            "averageDuration": self.totalDuration / self.runCount if self.runCount > 0 else 0.0,
+            "maximumDuration": self.maximumDuration
+        }
+
+
+class DaemonThreadPool(ThreadPool):
+    """
+    Thread pool whose workers do not prevent the interpreter from exiting, so a job still running after the shutdown
+    timeout is abandoned instead of blocking the process exit.
+    """
+
+    @staticmethod
+    def threadFactory(*args, **kwargs):
+        return threading.Thread(*args, daemon=True, **kwargs)
+
+
+class Service:
+    """
+    Background job scheduler
+
+    Runs named recurring jobs registered by module services on a thread pool isolated from the reactor thread pool
+    used by the interfaces. A job never overlaps with itself: if a run is still in progress when the job is due,
+    the run is skipped.
+
+    The scheduler stops triggering jobs once the application is asked to close and waits for the running ones before
+    the reactor stops, up to shutdownTimeout seconds. Long running jobs should stop early: cancellable jobs receive a
+    threading.Event set when they are removed or the application is asked to close. Jobs still running after the
+    timeout are abandoned, the pool workers being daemon threads.
+    """
+    log = Logger()
+
+    # loaded at startup even with lazy loading, the thread pool being started with the application
+    eager = True
+
+    def __init__(self, application):
+        self.application = application
+        self.pendingApplicationShutdown = False
+
+        self._jobs = {}
+
+        schedulerConfig = self.application.config.get("scheduler", {})
+        self.shutdownTimeout = float(schedulerConfig.get("shutdownTimeout", 30))
+        self._threadPool = DaemonThreadPool(
+            1,
+            int(schedulerConfig.get("threadPoolSize", 2)),
+            "default.scheduler"
+        )
+
+        # binding method to run when application completed startup process
+        self.application.eventDispatcher.addObserver(
+            Application.kEventApplicationStart,
+            self._applicationStart
+        )
+
+        # binding method to run when the application is asked to close
+        self.application.eventDispatcher.addObserver(
+            Application.kEventApplicationStop,
+            self._applicationStop
+        )
+
+    def _applicationStart(self, data):
+        """
+        Method called when application completed startup process.
+
+        :param data: <object> event data object
+        :return: <void>
+        """
+        self._threadPool.start()
+
+        # delaying the reactor shutdown until running jobs complete
+        reactor.addSystemEventTrigger("before", "shutdown", self._drain)
+
+    def _applicationStop(self, data):
+        """
+        Method to run when the application is asked to close.
+
+        :param data: <object> event data object
+        :return: <void>
+        """
+        self.pendingApplicationShutdown = True
+
+        for job in self._jobs.values():
+            job.cancelled.set()
+            if job.call is not None and job.call.active():
+                job.call.cancel()
+            job.call = None
+
+    def _drain(self):
+        """
+        Wait for the running jobs to complete, bounded by the configured shutdown timeout.
+
+        :return: <Deferred>
+        """
+        self._applicationStop(None)
+
+        waitStart = monotonic()
+        drained = defer.Deferred()
+
+        def checkRunningJobs():
+            runningJobs = [job.name for job in self._jobs.values() if job.running]
+
+            if len(runningJobs) == 0:
+                self._threadPool.stop()
+                drained.callback(None)
+            elif monotonic() - waitStart >= self.shutdownTimeout:
+                self.log.warn(
+                    "[Default.Scheduler] Shutdown timeout reached with jobs still running: {jobs}",
+                    jobs=", ".join(runningJobs)
+                )
+
+                # stopping the idle workers without waiting for the running jobs
+                threading.Thread(target=self._threadPool.stop, name="default.scheduler.stop", daemon=True).start()
+                drained.callback(None)
+            else:
+                reactor.callLater(0.1, checkRunningJobs)
+
+        checkRunningJobs()
+        return drained
+
+    def addJob(self, name, function, interval=None, cron=None, jitter=0, runImmediately=False, cancellable=False):
+        """
+        Register a recurring job.
+
+        :param name: <str> unique job name
+        :param function: <function> method called on the scheduler thread pool, with the job's cancellation event as
+                         argument if cancellable
+        :param interval: <float> seconds between runs, mutually exclusive with cron
+        :param cron: <str> cron expression evaluated in UTC, mutually exclusive with interval
+        :param jitter: <float> maximum random delay in seconds added to each run
+        :param runImmediately: <bool> run the job as soon as possible before following the schedule
+        :param cancellable: <bool> pass the job a threading.Event set when it should stop early
+        :return: <void>
+        """
+        if name in self._jobs:
+            raise ValueError("[Default.Scheduler]: A job with the name {} already exists.".format(name))
+
+        if (interval is None) == (cron is None):
+            raise ValueError("[Default.Scheduler]: Job {} must define either an interval or a cron schedule."
+                             .format(name))
+
+        if interval is not None and interval <= 0:
+            raise ValueError("[Default.Scheduler]: Job {} interval must be greater than 0.".format(name))
+
+        job = Job(
+            name,
+            function,
+            interval,
+            CronSchedule(cron) if cron is not None else None,
+            jitter,
+            cancellable
+        )
+        self._jobs[name] = job
+
+        if self.pendingApplicationShutdown:
+            return
+
+        if runImmediately:
+            job.call = reactor.callLater(0, self._runJob, job)
+        else:
+            self._scheduleJob(job)
+
+    def removeJob(self, name):
+        """
+        Stop triggering a job. A run in progress is not interrupted, a cancellable job is asked to stop.
+
+        :param name: <str> job name
+        :return: <void>
+        """
+        job = self._jobs.pop(name, None)
+        if job is None:
+            return
+
+        job.cancelled.set()
+        if job.call is not None and job.call.active():
+            job.call.cancel()
+
+    def getMetrics(self):
+        """
+        Return the run metrics of all jobs.
+
+        :return: <dict> job metrics by job name
+        """
+        return {name: job.getMetrics() for name, job in self._jobs.items()}
+
+    def _scheduleJob(self, job):
+        """
+        Schedule the next run of a job.
+
+        :param job: <Job>
+        :return: <void>
+        """
+        if job.interval is not None:
+            delay = job.interval
+        else:
+            now = datetime.utcnow()
+            delay = (job.cron.getNextTime(now) - now).total_seconds()
+
+        if job.jitter > 0:
+            delay += random.uniform(0, job.jitter)
+
+        job.call = reactor.callLater(delay, self._runJob, job)
+
+    def _runJob(self, job):
+        """
+        Trigger a job run on the scheduler thread pool, unless the previous run is still in progress.
+
+        :param job: <Job>
+        :return: <void>
+        """
+        job.call = None
+        if self.pendingApplicationShutdown or self._jobs.get(job.name) is not job:
+            return
+
+        self._scheduleJob(job)
+
+        if job.running:
+            job.skippedCount += 1
+            self.log.warn(
+                "[Default.Scheduler] Skipped job {name}, previous run is still in progress.",
+                name=job.name
+            )
+            return
+
+        job.running = True
+        job.lastRunTime = datetime.utcnow()
+        runStart = monotonic()
+
+        def resultCallback(success, result):
+            reactor.callFromThread(self._jobCompleted, job, monotonic() - runStart, success, result)
+
+        if job.cancellable:
+            self._threadPool.callInThreadWithCallback(resultCallback, job.function, job.cancelled)
+        else:
+            self._threadPool.callInThreadWithCallback(resultCallback, job.function)
+
+    def _jobCompleted(self, job, duration, success, result):
+        """
+        Record the metrics of a completed job run.
+
+        :param job: <Job>
+        :param duration: <float> run duration in seconds
+        :param success: <bool> True if the job did not raise an exception
+        :param result: <object> job return value or Failure
+        :return: <void>
+        """
+        job.running = False
+        job.runCount += 1
+        job.lastDuration = duration
+        job.totalDuration += duration
+        job.maximumDuration = max(job.maximumDuration, duration)
+
+        if not success:
+            job.failureCount += 1
+            self.log.error(
+                "[Default.Scheduler] Job {name} failed. Error: {error}",
+                name=job.name,
+                error=result.getErrorMessage()
+            )
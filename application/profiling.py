@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import random
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+
+from twisted.logger import Logger
+from twisted.internet import threads
+from twisted.internet.task import LoopingCall
+
+
+class StackSampler(threading.Thread):
+    """
+    Sampler of the call stack of a thread, counting the stacks in the collapsed format used by flame graph tools.
+    """
+
+    def __init__(self, threadID, interval):
+        """
+        :param threadID: <int> identifier of the sampled thread
+        :param interval: <float> seconds between samples
+        """
+        super(StackSampler, self).__init__(name="application.profiler", daemon=True)
+        self.threadID = threadID
+        self.interval = interval
+
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.threadID)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                frames.append("{}:{}".format(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+
+            frames.reverse()
+            self.stacks[";".join(frames)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class RequestProfiler:
+    """
+    Runtime request profiler
+
+    Profiles a sample of the requests, controlled at runtime by a JSON file polled every checkInterval seconds:
+
+        {
+            "sampleRate": 0.05,
+            "methods": ["default.article.search"],
+            "allocations": true
+        }
+
+    Requests of the listed methods, or of every method if none are listed, are profiled with the given probability
+    (1 by default). Profiling stops when the file is removed. The requests are profiled one at a time, cProfile and
+    tracemalloc being process wide, sampled requests arriving while another one is profiled are not profiled.
+
+    Each profiled request runs under cProfile while a sampler thread records its call stacks. If allocations is set,
+    tracemalloc traces the allocations made during the request, including the ones made by other threads meanwhile,
+    and the memory still allocated once it completes is recorded. Only the work performed by the thread handling the
+    request is profiled, not the callbacks completing it on other threads.
+
+    The results are aggregated and written to outputPath every dumpInterval seconds, when profiling stops and on
+    shutdown: the cProfile statistics (.pstats), a summary of the requests and of the most expensive functions
+    (.txt) and the CPU and memory collapsed stacks (.cpu.collapsed and .memory.collapsed) for flame graph tools.
+    """
+    log = Logger()
+
+    def __init__(self, profilingConfig):
+        """
+        :param profilingConfig: <dict> performance.profiling configuration section
+        """
+        self.config = profilingConfig
+
+        self.active = False
+        self.sampleRate = 1.0
+        self.methods = frozenset()
+        self.traceAllocations = False
+
+        self.profiledCount = 0
+        self.skippedCount = 0
+
+        self._controlState = None
+        self._controlCheck = None
+        self._dumpCall = None
+
+        self._profilingLock = threading.Lock()
+        self._resultsLock = threading.Lock()
+        self._resetResults()
+
+    def _resetResults(self):
+        self._stats = None
+        self._cpuStacks = Counter()
+        self._memoryStacks = Counter()
+        self._requests = {}
+
+    def start(self):
+        """
+        Start polling the control file and writing the results periodically.
+
+        :return: <void>
+        """
+        self._controlCheck = LoopingCall(self.checkControl)
+        self._controlCheck.start(float(self.config["checkInterval"]))
+
+        self._dumpCall = LoopingCall(lambda: threads.deferToThread(self.dump))
+        self._dumpCall.start(float(self.config["dumpInterval"]), False)
+
+    def stop(self):
+        """
+        Stop profiling and write the remaining results.
+
+        :return: <void>
+        """
+        for loopingCall in (self._controlCheck, self._dumpCall):
+            if loopingCall is not None and loopingCall.running:
+                loopingCall.stop()
+
+        self.active = False
+        self.dump()
+
+    def checkControl(self):
+        """
+        Read the control file if it changed since it was last read.
+
+        :return: <void>
+        """
+        controlPath = self.config["controlPath"]
+        try:
+            controlStat = os.stat(controlPath)
+            controlState = (controlStat.st_mtime_ns, controlStat.st_size)
+        except FileNotFoundError:
+            controlState = None
+        except OSError as e:
+            self.log.warn("[Profiler] Cannot check the control file. Error: {error}", error=str(e))
+            return
+
+        if controlState == self._controlState:
+            return
+
+        self._controlState = controlState
+        if controlState is None:
+            self._deactivate()
+            return
+
+        try:
+            with open(controlPath) as controlFile:
+                control = json.load(controlFile)
+
+            sampleRate = float(control.get("sampleRate", 1.0))
+            methods = frozenset(control.get("methods", []))
+            traceAllocations = bool(control.get("allocations", False))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.log.warn("[Profiler] Invalid control file, profiling stopped. Error: {error}", error=str(e))
+            self._deactivate()
+            return
+
+        self.sampleRate = sampleRate
+        self.methods = methods
+        self.traceAllocations = traceAllocations
+        self.active = sampleRate > 0
+
+        self.log.info(
+            "[Profiler] Profiling {rate:.1%} of the requests of {methods}, allocations {allocations}.",
+            rate=sampleRate,
+            methods=", ".join(sorted(methods)) if len(methods) > 0 else "all methods",
+            allocations="traced" if traceAllocations else "not traced"
+        )
+
+    def _deactivate(self):
+        if not self.active:
+            return
+
+        self.active = False
+        self.log.info("[Profiler] Profiling stopped.")
+        threads.deferToThread(self.dump)
+
+    def isSampled(self, method):
+        """
+        Return whether a request should be profiled.
+
+        :param method: <str> request method
+        :return: <bool>
+        """
+        if not self.active:
+            return False
+
+        if len(self.methods) > 0 and method not in self.methods:
+            return False
+
+        return self.sampleRate >= 1 or random.random() < self.sampleRate
+
+    def run(self, method, function, *args):
+        """
+        Call a function handling a request, profiling it unless another request is being profiled.
+
+        :param method: <str> request method
+        :param function: <function> function handling the request
+        :param args: function arguments
+        :return: <object> function result
+        """
+        if not self._profilingLock.acquire(blocking=False):
+            self.skippedCount += 1
+            return function(*args)
+
+        try:
+            traceAllocations = self.traceAllocations and not tracemalloc.is_tracing()
+            if traceAllocations:
+                tracemalloc.start(int(self.config["tracebackLimit"]))
+
+            sampler = StackSampler(threading.get_ident(), float(self.config["stackSampleInterval"]))
+            sampler.start()
+
+            profile = cProfile.Profile()
+            start = perf_counter()
+            profile.enable()
+            try:
+                result = function(*args)
+            finally:
+                profile.disable()
+                duration = perf_counter() - start
+                sampler.stop()
+
+                snapshot = None
+                peakMemory = 0
+                if traceAllocations:
+                    snapshot = tracemalloc.take_snapshot()
+                    peakMemory = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+        finally:
+            # aggregating the results once the next request can be profiled
+            self._profilingLock.release()
+
+        self._addResults(method, profile, sampler.stacks, snapshot, duration, peakMemory)
+        return result
+
+    def _addResults(self, method, profile, cpuStacks, snapshot, duration, peakMemory):
+        memoryStacks = Counter()
+        if snapshot is not None:
+            # leaving out the allocations of the profiler itself
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__)
+            ))
+            for statistic in snapshot.statistics("traceback"):
+                stack = ";".join("{}:{}".format(frame.filename, frame.lineno) for frame in statistic.traceback)
+                memoryStacks[stack] += statistic.size
+
+        with self._resultsLock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+            self._cpuStacks.update(cpuStacks)
+            self._memoryStacks.update(memoryStacks)
+
+            requests = self._requests.setdefault(method, [0, 0, 0])
+            requests[0] += 1
+            requests[1] += duration
+            requests[2] = max(requests[2], peakMemory)
+
+            self.profiledCount += 1
+
+    def dump(self):
+        """
+        Write the results aggregated since the last dump, if any.
+
+        :return: <void>
+        """
+        with self._resultsLock:
+            stats = self._stats
+            cpuStacks = self._cpuStacks
+            memoryStacks = self._memoryStacks
+            requests = self._requests
+            self._resetResults()
+
+        if stats is None:
+            return
+
+        try:
+            os.makedirs(self.config["outputPath"], exist_ok=True)
+            pathPrefix = os.path.join(
+                self.config["outputPath"],
+                "profile-{}".format(datetime.now().strftime("%Y%m%d-%H%M%S"))
+            )
+
+            stats.dump_stats(pathPrefix + ".pstats")
+
+            for suffix, stacks in ((".cpu.collapsed", cpuStacks), (".memory.collapsed", memoryStacks)):
+                if len(stacks) == 0:
+                    continue
+
+                with open(pathPrefix + suffix, "w") as stacksFile:
+                    for stack, weight in stacks.items():
+                        stacksFile.write("{} {}\n".format(stack, weight))
+
+            with open(pathPrefix + ".txt", "w") as summaryFile:
+                summaryFile.write("{:<40} {:>8} {:>14} {:>16}\n".format(
+                    "method", "requests", "average (ms)", "peak memory (B)"
+                ))
+                for method, (count, duration, peakMemory) in sorted(requests.items()):
+                    summaryFile.write("{:<40} {:>8} {:>14.3f} {:>16}\n".format(
+                        method, count, duration / count * 1000, peakMemory
+                    ))
+                summaryFile.write("\n")
+
+                stats.stream = summaryFile
+                stats.sort_stats("cumulative").print_stats(40)
+        except OSError as e:
+            self.log.error("[Profiler] Cannot write the profiling results. Error: {error}", error=str(e))
+            return
+
+        self.log.info(
+            "[Profiler] Wrote the results of {count} requests to {path}.",
+            count=sum(request[0] for request in requests.values()),
+            path=pathPrefix
+        )
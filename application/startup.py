@@ -0,0 +1,406 @@
+import os
+import ast
+import threading
+import importlib.util
+from contextlib import contextmanager
+from time import perf_counter
+
+from twisted.logger import Logger
+from twisted.internet import reactor, defer, threads
+from twisted.python.threadable import isInIOThread
+
+from nx.viper.module import Module as ViperModule
+
+
+class StartupProfile:
+    """
+    Startup time profile
+
+    Records the duration of the startup steps (framework initialization, module configuration, model and service
+    import and instantiation, application start handlers, database connection) and reports them once the
+    application is listening.
+    """
+    log = Logger()
+
+    def __init__(self):
+        self.startTime = perf_counter()
+        self._timings = []
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        """
+        Record the duration of a startup step.
+
+        :param name: <str> step name
+        :param duration: <float> duration in seconds
+        :return: <void>
+        """
+        with self._lock:
+            self._timings.append((perf_counter() - duration - self.startTime, name, duration))
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Record the duration of the wrapped block as a startup step.
+
+        :param name: <str> step name
+        :return: <void>
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - start)
+
+    def getElapsed(self):
+        """
+        Return the time elapsed since the profile was created, as early as possible during startup.
+
+        :return: <float> seconds
+        """
+        return perf_counter() - self.startTime
+
+    def report(self):
+        """
+        Log the recorded startup steps.
+
+        :return: <void>
+        """
+        with self._lock:
+            timings = sorted(self._timings)
+
+        self.log.info("[Startup] Startup profile, {total:.1f} ms since start:", total=self.getElapsed() * 1000)
+        for offset, name, duration in timings:
+            self.log.info(
+                "[Startup]   at {offset:7.1f} ms, {name}: {duration:.1f} ms",
+                offset=offset * 1000,
+                name=name,
+                duration=duration * 1000
+            )
+
+
+startupProfile = StartupProfile()
+
+
+class LazyInstance:
+    """
+    Placeholder for a model or service which is instantiated the first time it is looked up.
+
+    The placeholder is registered in the application in place of the instance, the application's getModel() /
+    getService() returning the instance it loads (see resolveLazyInstances()). Only attribute access is forwarded to
+    the instance: operations such as len(), bool(), iteration, comparisons and isinstance() apply to the placeholder
+    itself, which should therefore not be handed out. Once the reactor runs, instances are created on the reactor
+    thread even when first looked up by a request thread, as eagerly loaded models and services are.
+    """
+    __slots__ = ("identifier", "_factory", "_instance", "_lock")
+
+    def __init__(self, identifier, factory):
+        """
+        :param identifier: <str> model or service identifier
+        :param factory: <function> method returning the instance
+        """
+        object.__setattr__(self, "identifier", identifier)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.RLock())
+
+    def isLoaded(self):
+        """
+        Check if the instance was created.
+
+        :return: <bool>
+        """
+        return self._instance is not None
+
+    def load(self):
+        """
+        Return the instance, creating it if needed.
+
+        :return: <object>
+        """
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        if reactor.running and not isInIOThread():
+            return threads.blockingCallFromThread(reactor, self.load)
+
+        with self._lock:
+            if self._instance is None:
+                object.__setattr__(self, "_instance", self._factory())
+
+            return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.load(), name, value)
+
+
+def resolveLazyInstances(application):
+    """
+    Make the application's getModel() / getService() return the instances of lazily loaded models and services,
+    loading them if needed, instead of their placeholders.
+
+    :param application: <nx.viper.application.Application>
+    :return: <void>
+    """
+    if getattr(application, "lazyInstancesResolved", False):
+        return
+
+    def resolving(lookup):
+        def resolvedLookup(identifier):
+            instance = lookup(identifier)
+            if isinstance(instance, LazyInstance):
+                return instance.load()
+
+            return instance
+
+        return resolvedLookup
+
+    application.getModel = resolving(application.getModel)
+    application.getService = resolving(application.getService)
+    application.lazyInstancesResolved = True
+
+
+class LazyModule(ViperModule):
+    """
+    Viper module with startup profiling and lazy loading.
+
+    Model and service files are parsed before being imported: files which do not define a Model or Service class,
+    such as helpers placed next to services, are skipped.
+
+    If performance.lazyLoading is enabled the models and services of the module are imported and instantiated the
+    first time they are looked up, except the ones listed in performance.lazyLoading.eager and the ones whose class
+    sets the eager attribute, such as services observing the application start event, which they would otherwise
+    miss:
+
+        class Service:
+            # observing the application start event
+            eager = True
+    """
+    log = Logger()
+
+    # lazily loaded models and services not instantiated yet, loaded by warmUp()
+    pendingInstances = []
+
+    def __init__(self, moduleName, modulePath, application):
+        resolveLazyInstances(application)
+
+        with startupProfile.measure("module {}".format(moduleName)):
+            super(LazyModule, self).__init__(moduleName, modulePath, application)
+
+    def _loadConfiguration(self):
+        with startupProfile.measure("module {} configuration".format(self.name)):
+            super(LazyModule, self)._loadConfiguration()
+
+    def _inspectFile(self, filePath, className):
+        """
+        Parse a model or service file without importing it.
+
+        :param filePath: <str> path to the model or service file
+        :param className: <str> Model or Service
+        :return: <tuple> whether the file defines the class and whether the class sets eager to True
+        """
+        with open(filePath, encoding="utf-8") as sourceFile:
+            tree = ast.parse(sourceFile.read(), filePath)
+
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or node.name != className:
+                continue
+
+            for statement in node.body:
+                if isinstance(statement, ast.Assign) \
+                        and any(isinstance(target, ast.Name) and target.id == "eager" for target in statement.targets) \
+                        and isinstance(statement.value, ast.Constant):
+                    return True, statement.value.value is True
+
+            return True, False
+
+        return False, False
+
+    def _isLazy(self, identifier, eager):
+        """
+        Check if a model or service should be loaded on first use.
+
+        :param identifier: <str> model or service identifier
+        :param eager: <bool> the model or service class requires to be loaded at startup
+        :return: <bool>
+        """
+        lazyLoadingConfig = self.application.config["performance"].get("lazyLoading", {})
+
+        return lazyLoadingConfig.get("enabled", False) \
+            and not eager \
+            and identifier not in lazyLoadingConfig.get("eager", [])
+
+    def _createInstance(self, identifier, name, filePath, className):
+        """
+        Import a model or service file and instantiate its class.
+
+        :param identifier: <str> model or service identifier
+        :param name: <str> model or service name
+        :param filePath: <str> path to the model or service file
+        :param className: <str> Model or Service
+        :return: <object> instance, None if the file does not contain the class
+        """
+        with startupProfile.measure("{} {}".format(className.lower(), identifier)):
+            spec = importlib.util.spec_from_file_location(name, filePath)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            if not hasattr(module, className):
+                return None
+
+            return getattr(module, className)(self.application)
+
+    def _addInstance(self, name, filePath, className, instances, addFunction):
+        """
+        Add a model or service to the application, as a LazyInstance if it should be loaded on first use.
+
+        :param name: <str> model or service name
+        :param filePath: <str> path to the model or service file
+        :param className: <str> Model or Service
+        :param instances: <dict> application models or services by identifier
+        :param addFunction: <function> application addModel() or addService()
+        :return: <void>
+        """
+        identifier = "{}.{}".format(self.name, name)
+
+        definesClass, eager = self._inspectFile(filePath, className)
+        if not definesClass:
+            return
+
+        if not self._isLazy(identifier, eager):
+            instance = self._createInstance(identifier, name, filePath, className)
+            if instance is not None:
+                addFunction(self.name, name, instance)
+            return
+
+        def factory():
+            instance = self._createInstance(identifier, name, filePath, className)
+
+            # replacing the placeholder so following lookups return the instance directly
+            if instance is None:
+                instances.pop(identifier, None)
+                raise Exception("[Startup]: {} does not contain a {}.".format(filePath, className))
+
+            instances[identifier] = instance
+            return instance
+
+        lazyInstance = LazyInstance(identifier, factory)
+        addFunction(self.name, name, lazyInstance)
+        self.pendingInstances.append(lazyInstance)
+
+    def _loadModels(self):
+        modelsPath = os.path.join(self.path, "model")
+        if not os.path.isdir(modelsPath):
+            return
+
+        for modelFile in os.listdir(modelsPath):
+            modelPath = os.path.join(modelsPath, modelFile)
+            if not os.path.isfile(modelPath) or not modelFile.endswith(".py"):
+                continue
+
+            self._addInstance(
+                modelFile.replace(".py", ""),
+                modelPath,
+                "Model",
+                self.application._models,
+                self.application.addModel
+            )
+
+    def _loadService(self, servicePath):
+        self._addInstance(
+            os.path.basename(servicePath).replace(".py", ""),
+            servicePath,
+            "Service",
+            self.application._services,
+            self.application.addService
+        )
+
+    @classmethod
+    def warmUp(cls, chunkSize=1):
+        """
+        Instantiate the lazily loaded models and services not used yet, a few at a time on the reactor thread so
+        that requests keep being served meanwhile.
+
+        :param chunkSize: <int> number of models and services instantiated per reactor iteration
+        :return: <Deferred> fired once all are instantiated
+        """
+        pendingInstances = cls.pendingInstances
+        cls.pendingInstances = []
+
+        warmedUp = defer.Deferred()
+
+        def loadChunk(start):
+            for lazyInstance in pendingInstances[start:start + chunkSize]:
+                if lazyInstance.isLoaded():
+                    continue
+
+                try:
+                    lazyInstance.load()
+                except Exception as e:
+                    cls.log.error(
+                        "[Startup] Cannot load {identifier}. Error: {error}",
+                        identifier=lazyInstance.identifier,
+                        error=str(e)
+                    )
+
+            if start + chunkSize < len(pendingInstances):
+                reactor.callLater(0, loadChunk, start + chunkSize)
+            else:
+                warmedUp.callback(None)
+
+        reactor.callLater(0, loadChunk, 0)
+        return warmedUp
+
+
+def profileApplication(application):
+    """
+    Profile the application start event handlers, which initialize services such as the database connection pool.
+    Must be called before the application is started.
+
+    :param application: <nx.viper.application.Application>
+    :return: <void>
+    """
+    startTimes = []
+
+    def startBegin(data):
+        startTimes.append(perf_counter())
+
+    def startEnd(data):
+        startupProfile.add("application start handlers", perf_counter() - startTimes[0])
+
+    application.eventDispatcher.addObserver(application.kEventApplicationStart, startBegin, 1000)
+    application.eventDispatcher.addObserver(application.kEventApplicationStart, startEnd, -1000)
+
+
+def startupCompleted(application):
+    """
+    Method called once the reactor runs and the interfaces are listening. Reports the startup profile after
+    loading the remaining lazily loaded models and services, if enabled, and waiting for the first database query.
+
+    :param application: <nx.viper.application.Application>
+    :return: <void>
+    """
+    startupProfile.add("listening", startupProfile.getElapsed())
+
+    lazyLoadingConfig = application.config["performance"].get("lazyLoading", {})
+    if lazyLoadingConfig.get("enabled", False) and lazyLoadingConfig.get("warmUp", True):
+        warmUpStart = perf_counter()
+        warmUp = LazyModule.warmUp()
+        warmUp.addCallback(lambda result: startupProfile.add("warm-up (incremental)", perf_counter() - warmUpStart))
+
+        pending = [warmUp]
+    else:
+        pending = []
+
+    mysqlConfig = application.config.get("viper.mysql", {})
+    if len(mysqlConfig.get("host", "")) > 0 and len(mysqlConfig.get("name", "")) > 0:
+        queryStart = perf_counter()
+        query = application.getService("viper.mysql").runQuery("SELECT 1;")
+        query.addCallback(lambda result: startupProfile.add("database first query", perf_counter() - queryStart))
+        pending.append(query)
+
+    defer.DeferredList(pending).addCallback(lambda result: startupProfile.report())
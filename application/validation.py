@@ -0,0 +1,106 @@
+"""
+Request parameter validation
+
+Controllers declare the parameters of each action in a parameterSchema class attribute, mapping the action name
+to its parameters:
+
+    parameterSchema = {
+        "update": {
+            "article_id": {"type": int},
+            "title": {"type": str, "maximumLength": 128, "required": False}
+        }
+    }
+
+Parameters are required unless specified otherwise. The schema is compiled once into a validator function returning
+the same errors the actions used to report: <parameter>.IsEmpty, <parameter>.Not<Type> and <parameter>.TooLong.
+"""
+
+kTypeErrors = {
+    str: "NotString",
+    int: "NotInt",
+    float: "NotFloat",
+    bool: "NotBool",
+    list: "NotList",
+    dict: "NotDict"
+}
+
+
+def compileParameterRules(name, rules):
+    """
+    Compile the rules of a parameter into a check.
+
+    :param name: <str> parameter name
+    :param rules: <dict> parameter rules
+        :param type: <type> one of str, int, float, bool, list, dict
+        :param required: <bool> optional, True by default
+        :param maximumLength: <int> optional, maximum length of str, list and dict values
+    :return: <tuple> name, required, accepted types, rejected types, maximum length and error messages
+    """
+    unknownRules = set(rules) - {"type", "required", "maximumLength"}
+    if len(unknownRules) > 0:
+        raise ValueError("[Validation]: Unknown rules for parameter {}: {}.".format(name, ", ".join(unknownRules)))
+
+    parameterType = rules.get("type")
+    if parameterType not in kTypeErrors:
+        raise ValueError("[Validation]: Unsupported type for parameter {}.".format(name))
+
+    maximumLength = rules.get("maximumLength")
+    if maximumLength is not None and parameterType not in (str, list, dict):
+        raise ValueError("[Validation]: Parameter {} does not support a maximum length.".format(name))
+
+    # JSON integers are accepted as floats, booleans are rejected as bool is a subclass of int
+    acceptedTypes = (int, float) if parameterType is float else parameterType
+    rejectedTypes = bool if parameterType in (int, float) else ()
+
+    return (
+        name,
+        rules.get("required", True),
+        acceptedTypes,
+        rejectedTypes,
+        maximumLength,
+        "{}.IsEmpty".format(name),
+        "{}.{}".format(name, kTypeErrors[parameterType]),
+        "{}.TooLong".format(name)
+    )
+
+
+def compileSchema(schema):
+    """
+    Compile the parameter schema of an action into a validator.
+
+    :param schema: <dict> rules by parameter name
+    :return: <function(<dict>)> validator returning the list of errors of the request parameters
+    """
+    checks = tuple(compileParameterRules(name, rules) for name, rules in schema.items())
+
+    def validate(parameters):
+        errors = []
+
+        for name, required, acceptedTypes, rejectedTypes, maximumLength, errorEmpty, errorType, errorLength in checks:
+            if name not in parameters:
+                if required:
+                    errors.append(errorEmpty)
+                continue
+
+            value = parameters[name]
+            if not isinstance(value, acceptedTypes) or isinstance(value, rejectedTypes):
+                errors.append(errorType)
+            elif maximumLength is not None and len(value) > maximumLength:
+                errors.append(errorLength)
+
+        return errors
+
+    return validate
+
+
+def compileControllerSchema(controllerClass):
+    """
+    Compile the parameter schemas of a controller's actions.
+
+    :param controllerClass: <class> controller with an optional parameterSchema attribute
+    :return: <dict> validators by action name
+    """
+    return {
+        action: compileSchema(schema)
+        for action, schema in getattr(controllerClass, "parameterSchema", {}).items()
+    }
@@ -0,0 +1,137 @@
+"""
+Article search benchmark
+
+Builds the in-process title index used by default.articleIndex over a synthetic dataset of article titles, words
+being drawn from a vocabulary with a Zipf distribution as in natural language, and compares its search latency with
+a scan of all the titles, as performed by a LIKE query or by clients filtering the articles themselves. Reports the
+index build time and memory, and the latency of first and deep pages for common, rare and combined words.
+
+Run from the application directory:
+
+    python script/benchmark/articleSearch.py [--articles 1000000] [--vocabulary 50000] [--limit 20]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import argparse
+import random
+import string
+import tracemalloc
+from itertools import accumulate
+from time import perf_counter
+
+from application.module.default.library.invertedIndex import InvertedIndex, getTerms
+
+
+def generateTitles(articleCount, vocabularySize):
+    """
+    Generate article titles of 3 to 10 words, returning them with the vocabulary sorted by frequency.
+    """
+    vocabulary = []
+    words = set()
+    while len(vocabulary) < vocabularySize:
+        word = "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 10)))
+        if word not in words:
+            words.add(word)
+            vocabulary.append(word)
+
+    cumulativeWeights = list(accumulate(1 / rank for rank in range(1, vocabularySize + 1)))
+    titles = [
+        " ".join(random.choices(vocabulary, cum_weights=cumulativeWeights, k=random.randint(3, 10))).capitalize()
+        for _ in range(articleCount)
+    ]
+
+    return titles, vocabulary
+
+
+def buildIndex(titles):
+    index = InvertedIndex(3)
+    for articleID, title in enumerate(titles, 1):
+        index.add(articleID, title)
+
+    return index
+
+
+def scan(titles, terms, offset, limit):
+    """
+    Search by testing the words of every title, most recent first.
+    """
+    matches = []
+    for articleID in range(len(titles), 0, -1):
+        words = titles[articleID - 1].lower().split()
+        if all(term in words for term in terms):
+            matches.append(articleID)
+            if len(matches) > offset + limit:
+                break
+
+    return matches[offset:offset + limit]
+
+
+def measure(function, repetitions):
+    start = perf_counter()
+    for _ in range(repetitions):
+        function()
+
+    return (perf_counter() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Article search benchmark")
+    parser.add_argument("--articles", type=int, default=1000000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repetitions", type=int, default=200)
+    arguments = parser.parse_args()
+
+    random.seed(0)
+    titles, vocabulary = generateTitles(arguments.articles, arguments.vocabulary)
+
+    start = perf_counter()
+    index = buildIndex(titles)
+    buildDuration = perf_counter() - start
+
+    # measuring the memory of a second build, tracing slows it down
+    del index
+    tracemalloc.start()
+    index = buildIndex(titles)
+    indexMemory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("{} articles indexed in {:.2f} s, {:.0f} MB".format(len(index), buildDuration, indexMemory / 1000000))
+
+    common = vocabulary[0]
+    frequent = vocabulary[20]
+    rare = vocabulary[arguments.vocabulary // 2]
+    queries = (
+        ("common word", common),
+        ("rare word", rare),
+        ("common + frequent words", "{} {}".format(common, frequent)),
+        ("common + rare words", "{} {}".format(common, rare)),
+        ("unknown word", "zzzzzzzzzzzz")
+    )
+
+    print("{} {:>12} {:>12} {:>12}".format("query".ljust(32), "index (us)", "scan (us)", "speedup"))
+    for name, query in queries:
+        terms = getTerms(query, 3)
+
+        for page in (1, 500):
+            offset = (page - 1) * arguments.limit
+
+            indexDuration = measure(lambda: index.search(terms, offset, arguments.limit), arguments.repetitions)
+            scanDuration = measure(lambda: scan(titles, terms, offset, arguments.limit), 1)
+
+            # both searches return the same articles
+            articleIDs, _ = index.search(terms, offset, arguments.limit)
+            assert articleIDs == scan(titles, terms, offset, arguments.limit)
+
+            print("{} {:12.1f} {:12.1f} {:11.0f}x".format(
+                "{}, page {}".format(name, page).ljust(32),
+                indexDuration * 1000000,
+                scanDuration * 1000000,
+                scanDuration / indexDuration
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Connection policies benchmark
+
+Compares the previous policy chain (ThrottlingFactory, LimitConnectionsByPeer and TimeoutFactory wrapping the HTTP
+factory) with the HTTP factory enforcing the policies itself, measuring accepted connections per second and the
+throughput of data delivered to an established connection. Before benchmarking, it checks that a connection rejected
+by the policies is aborted when the HTTP factory is wrapped for TLS.
+
+Run from the application directory:
+
+    python script/benchmark/connectionPolicies.py [--connections 100000] [--megabytes 256]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import argparse
+import tempfile
+import importlib.util
+from time import perf_counter
+
+from twisted.internet.address import IPv4Address
+from twisted.internet.testing import StringTransport
+from twisted.protocols.policies import WrappingFactory, ThrottlingFactory, LimitConnectionsByPeer, TimeoutFactory
+from twisted.protocols.tls import TLSMemoryBIOFactory
+
+from application.interface.http.tls import ReloadableCertificateOptions
+from tlsHandshake import createCertificate
+
+# the interface is loaded the same way the Viper application loads it
+httpSpec = importlib.util.spec_from_file_location("http", "application/interface/http/http.py")
+http = importlib.util.module_from_spec(httpSpec)
+httpSpec.loader.exec_module(http)
+
+
+class Application:
+    config = {
+        "interface": {
+            "http": {
+                "connection": {
+                    "keepAlive": 5
+                }
+            }
+        }
+    }
+
+
+class LegacyHTTPFactory(http.HTTPFactory):
+    """
+    HTTP factory without policies, wrapped by the legacy policy chain.
+    """
+
+    def startFactory(self):
+        pass
+
+    def channelClosed(self, channel):
+        self.channels.discard(channel)
+
+    def buildProtocol(self, addr):
+        protocol = http.HTTPProtocol()
+        protocol.application = self.application
+        protocol.httpFactory = self
+        protocol.peerKey = None
+        protocol.setTimeout(self.keepAlive)
+        self.channels.add(protocol)
+        return protocol
+
+
+class LegacyLimitConnectionsByPeer(LimitConnectionsByPeer):
+    """
+    LimitConnectionsByPeer as previously patched by the HTTP interface.
+    """
+
+    def buildProtocol(self, addr):
+        peerHost = addr.host
+        connectionCount = self.peerConnections.get(peerHost, 0)
+        if connectionCount >= self.maxConnectionsPerPeer:
+            return None
+        self.peerConnections[peerHost] = connectionCount + 1
+        return WrappingFactory.buildProtocol(self, addr)
+
+    def unregisterProtocol(self, p):
+        peerHost = p.getPeer().host
+        self.peerConnections[peerHost] -= 1
+        if self.peerConnections[peerHost] == 0:
+            del self.peerConnections[peerHost]
+
+
+def createLegacyFactory():
+    httpFactory = LegacyHTTPFactory()
+    httpFactory.application = Application()
+    httpFactory.keepAlive = 5
+
+    limitFactory = LegacyLimitConnectionsByPeer(TimeoutFactory(httpFactory, 300))
+    limitFactory.maxConnectionsPerPeer = 5
+
+    factory = ThrottlingFactory(limitFactory, 50)
+    factory.doStart()
+    return factory, httpFactory
+
+
+def createFactory():
+    factory = http.HTTPFactory()
+    factory.application = Application()
+    factory.keepAlive = 5
+    factory.connectionTimeout = 300
+    factory.doStart()
+    return factory, factory
+
+
+class TCPStringTransport(StringTransport):
+    """
+    String transport accepting the TCP options set by the HTTP channel through the TLS wrapper.
+    """
+
+    def setTcpNoDelay(self, enabled):
+        pass
+
+
+def checkRejectedTLSConnection():
+    """
+    Check that a connection over the per peer limit is aborted, not left open, when the factory is wrapped for TLS.
+    """
+    with tempfile.TemporaryDirectory() as directoryPath:
+        certificatePath, privateKeyPath = createCertificate(directoryPath)
+        certificateOptions = ReloadableCertificateOptions({
+            "certificatePath": certificatePath,
+            "privateKeyPath": privateKeyPath,
+            "privateKeyPassphrase": "",
+            "certificateChainPaths": [],
+            "sessionCache": False,
+            "sessionTimeout": 300,
+            "sessionTickets": False,
+            "ciphers": "ECDHE+AESGCM:ECDHE+CHACHA20",
+            "curve": "",
+            "minimumVersion": "TLSv1_2"
+        })
+
+    httpFactory, _ = createFactory()
+    factory = TLSMemoryBIOFactory(certificateOptions, False, httpFactory)
+
+    address = IPv4Address("TCP", "10.0.0.1", 40000)
+    transports = []
+    for _ in range(httpFactory.maximumConnectionsByPeer + 1):
+        protocol = factory.buildProtocol(address)
+        transport = TCPStringTransport(peerAddress=address)
+        protocol.makeConnection(transport)
+        transports.append(transport)
+
+    accepted = transports[:-1]
+    rejected = transports[-1]
+    assert not any(transport.disconnecting for transport in accepted), "accepted TLS connection closed"
+    assert rejected.disconnecting, "rejected TLS connection left open"
+    assert len(httpFactory.channels) == len(accepted), "rejected TLS connection tracked as a channel"
+
+
+def benchmarkConnections(factory, count):
+    start = perf_counter()
+    for index in range(count):
+        address = IPv4Address("TCP", "10.0.{}.{}".format((index >> 8) & 0xFF, index & 0xFF), 40000)
+        protocol = factory.buildProtocol(address)
+        transport = StringTransport(peerAddress=address)
+        protocol.makeConnection(transport)
+        protocol.connectionLost(None)
+
+    return count / (perf_counter() - start)
+
+
+def benchmarkData(factory, httpFactory, megabytes):
+    address = IPv4Address("TCP", "10.0.0.1", 40000)
+    protocol = factory.buildProtocol(address)
+    protocol.makeConnection(StringTransport(peerAddress=address))
+
+    # the first request is left unanswered, the following data is buffered by the channel as pipelined requests
+    protocol.dataReceived(b"GET /1.0/default.article.get HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    channel = next(iter(httpFactory.channels))
+
+    chunk = b"x" * 4096
+    chunkCount = megabytes * 256
+
+    start = perf_counter()
+    for index in range(chunkCount):
+        protocol.dataReceived(chunk)
+        if index % 256 == 0:
+            del channel._dataBuffer[:]
+    duration = perf_counter() - start
+
+    protocol.connectionLost(None)
+    return megabytes / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connection policies benchmark")
+    parser.add_argument("--connections", type=int, default=100000)
+    parser.add_argument("--megabytes", type=int, default=256)
+    arguments = parser.parse_args()
+
+    checkRejectedTLSConnection()
+    print("rejected TLS connection: aborted")
+
+    for name, createFunction in (("policy chain", createLegacyFactory), ("fused policies", createFactory)):
+        factory, _ = createFunction()
+        connectionRate = benchmarkConnections(factory, arguments.connections)
+        dataRate = benchmarkData(*createFunction(), arguments.megabytes)
+        print("{}: {:9.0f} connections/s, {:8.1f} MiB/s".format(name.ljust(14), connectionRate, dataRate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Controller dispatch benchmark
+
+Compares dispatching default.article.get with a controller looking up its model and service in preDispatch()
+for every request, a controller with dependencies resolved once, and pooled controllers. Reports dispatch
+throughput and, using tracemalloc, the memory allocated for each in-flight request while a wave of requests waits
+for the database.
+
+Run from the application directory:
+
+    python script/benchmark/controllerDispatch.py [--requests 200000] [--inflight 64] [--rounds 5]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import argparse
+import datetime
+import importlib.util
+import tracemalloc
+from time import perf_counter
+
+from application.dispatcher import Dispatcher
+
+article = {
+    "article_id": 1,
+    "title": "Article",
+    "date": datetime.datetime(2020, 1, 1),
+    "ip": "127.0.0.1"
+}
+
+
+class ArticleModel:
+    def __init__(self):
+        self.immediate = True
+        self.pendingHandlers = []
+
+    def get(self, predicate, successHandler, failHandler=None):
+        if self.immediate:
+            successHandler(dict(article))
+        else:
+            self.pendingHandlers.append(successHandler)
+
+    def completePending(self):
+        pendingHandlers = self.pendingHandlers
+        self.pendingHandlers = []
+        for successHandler in pendingHandlers:
+            successHandler(dict(article))
+
+
+class Application:
+    def __init__(self, controllerPoolSize):
+        self.config = {
+            "performance": {
+                "controllerPoolSize": controllerPoolSize
+            }
+        }
+        self.articleModel = ArticleModel()
+
+    def isModuleLoaded(self, moduleName):
+        return moduleName == "default"
+
+    def getModel(self, modelIdentifier):
+        return self.articleModel
+
+    def getService(self, serviceIdentifier):
+        return None
+
+
+class RequestProtocol:
+    def __init__(self):
+        self.requestResponse = {"code": 0, "content": None, "errors": []}
+
+    def requestPassedDispatcherValidation(self):
+        pass
+
+    def failRequestWithErrors(self, errors):
+        raise Exception(errors)
+
+    def setResponseETag(self, eTag):
+        return False
+
+    def sendFinalRequestResponse(self):
+        pass
+
+
+def createLegacyDispatcher(application):
+    """
+    Dispatcher with a controller looking up its dependencies for every request, as controllers used to.
+    """
+    controllerSpec = importlib.util.spec_from_file_location(
+        "article",
+        "application/module/default/controller/article.py"
+    )
+    controllerModule = importlib.util.module_from_spec(controllerSpec)
+    controllerSpec.loader.exec_module(controllerModule)
+
+    # without __slots__ instances have a dictionary, as the Viper controllers
+    class LegacyController(controllerModule.Controller):
+        def preDispatch(self):
+            self.articleModel = self.application.getModel("default.article")
+            self.nestedService = self.application.getService("default.nestedService")
+
+    dispatcher = Dispatcher(application)
+    controllerClass, validators, _ = dispatcher._getController("default", "article")
+    dispatcher._controllers[("default", "article")] = (LegacyController, validators, None)
+
+    return dispatcher
+
+
+def createDispatcher(application):
+    return Dispatcher(application)
+
+
+def run(createFunction, controllerPoolSize, requestCount, inflightCount):
+    application = Application(controllerPoolSize)
+    dispatcher = createFunction(application)
+    requestPayload = {"version": 1.0, "method": "default.article.get", "parameters": {"article_id": 1}}
+
+    # warming up, loading the controller
+    for _ in range(inflightCount):
+        dispatcher.dispatch(RequestProtocol(), requestPayload)
+
+    requestProtocols = [RequestProtocol() for _ in range(1000)]
+    start = perf_counter()
+    for index in range(requestCount):
+        dispatcher.dispatch(requestProtocols[index % 1000], requestPayload)
+    requestRate = requestCount / (perf_counter() - start)
+
+    # measuring a wave of in-flight requests, after a first wave completed
+    application.articleModel.immediate = False
+    requestProtocols = [RequestProtocol() for _ in range(inflightCount)]
+    for requestProtocol in requestProtocols:
+        dispatcher.dispatch(requestProtocol, requestPayload)
+    application.articleModel.completePending()
+
+    tracemalloc.start()
+    for requestProtocol in requestProtocols:
+        dispatcher.dispatch(requestProtocol, requestPayload)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    application.articleModel.completePending()
+
+    return requestRate, allocated / inflightCount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Controller dispatch benchmark")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--inflight", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    arguments = parser.parse_args()
+
+    scenarios = (
+        ("lookups per request", createLegacyDispatcher, 0),
+        ("resolved dependencies", createDispatcher, 0),
+        ("pooled controllers", createDispatcher, arguments.inflight)
+    )
+
+    # interleaving the scenarios and keeping the best result of each
+    results = {}
+    for _ in range(arguments.rounds):
+        for name, createFunction, controllerPoolSize in scenarios:
+            requestRate, inflightMemory = run(createFunction, controllerPoolSize, arguments.requests,
+                                              arguments.inflight)
+            bestRate, _ = results.get(name, (0, 0))
+            results[name] = (max(bestRate, requestRate), inflightMemory)
+
+    for name, _, _ in scenarios:
+        requestRate, inflightMemory = results[name]
+        print("{}: {:9.0f} requests/s, {:6.0f} bytes allocated per in-flight request".format(
+            name.ljust(21),
+            requestRate,
+            inflightMemory
+        ))
+
+
+if __name__ == "__main__":
+    main()
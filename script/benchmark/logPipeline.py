@@ -0,0 +1,83 @@
+"""
+Log pipeline benchmark
+
+Compares the time spent by the logging callers with Twisted's synchronous text file observer, as used by twistd,
+and with the asynchronous JSON lines pipeline, from several threads logging concurrently.
+
+Run from the application directory:
+
+    python script/benchmark/logPipeline.py [--events 200000] [--threads 4]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import os
+import argparse
+import tempfile
+import threading
+from time import perf_counter
+
+from twisted.logger import Logger, LogPublisher, textFileLogObserver
+from twisted.python.logfile import LogFile
+
+from application.log import LogPipeline
+
+
+def run(observer, eventCount, threadCount):
+    """
+    Log from several threads, returning the average time spent per logging call.
+    """
+    publisher = LogPublisher(observer)
+    log = Logger(namespace="benchmark", observer=publisher)
+    durations = []
+
+    def logEvents():
+        start = perf_counter()
+        for index in range(eventCount // threadCount):
+            log.info("[Benchmark] Request {index} completed with code {code}.", index=index, code=200)
+        durations.append(perf_counter() - start)
+
+    threads = [threading.Thread(target=logEvents) for _ in range(threadCount)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(durations) / eventCount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log pipeline benchmark")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directoryPath:
+        logFile = LogFile.fromFullPath(os.path.join(directoryPath, "twistd.log"), rotateLength=10000000)
+        duration = run(textFileLogObserver(logFile), arguments.events, arguments.threads)
+        logFile.close()
+        print("synchronous text file : {:6.2f} us per call".format(duration * 1000000))
+
+        logPipeline = LogPipeline({
+            "path": os.path.join(directoryPath, "application.log"),
+            "rotateLength": 10000000,
+            "maxRotatedFiles": 10,
+            "queueSize": arguments.events,
+            "batchSize": 500,
+            "flushInterval": 1
+        })
+        logPipeline.start()
+        duration = run(logPipeline, arguments.events, arguments.threads)
+        drainStart = perf_counter()
+        logPipeline.stop()
+        print("JSON lines pipeline   : {:6.2f} us per call, {} written, {} dropped, drained in {:.2f} s".format(
+            duration * 1000000,
+            logPipeline.writtenCount,
+            logPipeline.droppedCount,
+            perf_counter() - drainStart
+        ))
+
+
+if __name__ == "__main__":
+    main()
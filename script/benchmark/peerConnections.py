@@ -0,0 +1,144 @@
+"""
+Peer connection accounting benchmark
+
+Compares Twisted's dictionary of host strings with PeerConnections when connections from a large number of
+distinct peers are opened and closed, reporting throughput and retained memory. Peers are drawn from a limited number
+of networks, as during a distributed scan, a quarter of them using IPv6.
+
+Run from the application directory:
+
+    python script/benchmark/peerConnections.py [--peers 1000000] [--networks 20000]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import argparse
+import random
+import socket
+import tracemalloc
+from time import perf_counter
+
+from application.interface.http.policies import PeerConnections
+
+
+def generatePeers(count, networkCount):
+    """
+    Generate distinct peer addresses in their packed form, the host strings are created while benchmarking as the
+    transport would.
+    """
+    networksIPv4 = [random.getrandbits(24) << 8 for _ in range(networkCount)]
+    networksIPv6 = [random.getrandbits(64) << 64 for _ in range(networkCount)]
+
+    peers = set()
+    while len(peers) < count:
+        if len(peers) % 4 == 0:
+            address = random.choice(networksIPv6) | random.getrandbits(64)
+            peers.add(address.to_bytes(16, "big"))
+        else:
+            address = random.choice(networksIPv4) | random.getrandbits(8)
+            peers.add(address.to_bytes(4, "big"))
+
+    return list(peers)
+
+
+def toHost(packedAddress):
+    return socket.inet_ntop(socket.AF_INET6 if len(packedAddress) == 16 else socket.AF_INET, packedAddress)
+
+
+def openDictionary(hosts):
+    peerConnections = {}
+    for host in hosts:
+        connectionCount = peerConnections.get(host, 0)
+        if connectionCount < 5:
+            peerConnections[host] = connectionCount + 1
+
+    return peerConnections, list(peerConnections)
+
+
+def closeDictionary(peerConnections, keys):
+    for key in keys:
+        peerConnections[key] -= 1
+        if peerConnections[key] == 0:
+            del peerConnections[key]
+
+
+def openPeerConnections(hosts, prefixLengthIPv4, prefixLengthIPv6):
+    peerConnections = PeerConnections(prefixLengthIPv4, prefixLengthIPv6)
+    keys = []
+    for host in hosts:
+        key = peerConnections.acquire(host, len(hosts))
+        if key is not None:
+            keys.append(key)
+
+    return peerConnections, keys
+
+
+def closePeerConnections(peerConnections, keys):
+    for key in keys:
+        peerConnections.release(key)
+
+
+def benchmark(peers, openFunction, closeFunction, *arguments):
+    """
+    Measure the open and close throughput, then the memory retained by the structure once all connections are
+    open. Host strings are created from the packed addresses as the transport would, so they are accounted only if
+    the structure keeps them.
+    """
+    hosts = [toHost(peer) for peer in peers]
+    start = perf_counter()
+    structure, keys = openFunction(hosts, *arguments)
+    openDuration = perf_counter() - start
+
+    start = perf_counter()
+    closeFunction(structure, keys)
+    closeDuration = perf_counter() - start
+
+    del hosts, structure, keys
+
+    tracemalloc.start()
+    hosts = [toHost(peer) for peer in peers]
+    structure, keys = openFunction(hosts, *arguments)
+    # the list of keys stands for the per protocol bookkeeping and is not part of the structure
+    del hosts, keys
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return structure, openDuration, closeDuration, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peer connection accounting benchmark")
+    parser.add_argument("--peers", type=int, default=1000000)
+    parser.add_argument("--networks", type=int, default=20000)
+    arguments = parser.parse_args()
+
+    random.seed(0)
+    peers = generatePeers(arguments.peers, arguments.networks)
+
+    def report(name, openDuration, closeDuration, retained, trackedPeers):
+        print("{}: open {:9.0f}/s, close {:9.0f}/s, {:8d} entries, {:7.1f} MiB".format(
+            name.ljust(28),
+            len(peers) / openDuration,
+            len(peers) / closeDuration,
+            trackedPeers,
+            retained / 1024 / 1024
+        ))
+
+    structure, *results = benchmark(peers, openDictionary, closeDictionary)
+    report("dictionary of host strings", *results, len(structure))
+
+    for prefixLengthIPv4, prefixLengthIPv6 in ((32, 128), (24, 64)):
+        structure, *results = benchmark(
+            peers,
+            openPeerConnections,
+            closePeerConnections,
+            prefixLengthIPv4,
+            prefixLengthIPv6
+        )
+        report("PeerConnections /{} /{}".format(prefixLengthIPv4, prefixLengthIPv6), *results, len(structure))
+        print("    top peers: {}".format(structure.getTopPeers(3)))
+
+
+if __name__ == "__main__":
+    main()
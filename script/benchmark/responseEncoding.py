@@ -0,0 +1,82 @@
+"""
+Response encoding benchmark
+
+Compares the JSON and MessagePack encodings of the HTTP interface on default.article.search responses, reporting
+the time spent encoding them on the server, decoding them on the client and their size.
+
+Run from the application directory:
+
+    python script/benchmark/responseEncoding.py [--articles 20] [--repetitions 20000]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import argparse
+import datetime
+from time import perf_counter
+
+from application.interface.http.encoding import jsonEncoding, messagePackEncoding
+
+
+def createResponse(articleCount):
+    return {
+        "code": 200,
+        "content": {
+            "articles": [
+                {
+                    "article_id": 1000000 - index,
+                    "title": "Article title number {} about the application".format(index),
+                    "date": datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=index)
+                }
+                for index in range(articleCount)
+            ],
+            "page": 1,
+            "limit": articleCount,
+            "hasMore": True
+        },
+        "errors": []
+    }
+
+
+def measure(function, repetitions):
+    start = perf_counter()
+    for _ in range(repetitions):
+        function()
+
+    return (perf_counter() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response encoding benchmark")
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--repetitions", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    arguments = parser.parse_args()
+
+    response = createResponse(arguments.articles)
+    encodings = (jsonEncoding, messagePackEncoding)
+
+    # interleaving the encodings and keeping the best result of each
+    results = {}
+    for _ in range(arguments.rounds):
+        for encoding in encodings:
+            body = encoding.encode(response)
+            encodeDuration = measure(lambda: encoding.encode(response), arguments.repetitions)
+            decodeDuration = measure(lambda: encoding.decode(body), arguments.repetitions)
+
+            bestEncode, bestDecode, _ = results.get(encoding.name, (encodeDuration, decodeDuration, 0))
+            results[encoding.name] = (min(bestEncode, encodeDuration), min(bestDecode, decodeDuration), len(body))
+
+    for encoding in encodings:
+        encodeDuration, decodeDuration, length = results[encoding.name]
+        print("{}: encode {:7.1f} us, decode {:7.1f} us, {:6d} bytes".format(
+            encoding.name.ljust(8),
+            encodeDuration * 1000000,
+            decodeDuration * 1000000,
+            length
+        ))
+
+
+if __name__ == "__main__":
+    main()
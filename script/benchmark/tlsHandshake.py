@@ -0,0 +1,159 @@
+"""
+TLS handshake benchmark
+
+Compares the number of server handshakes per second with and without session resumption using the HTTP
+interface TLS options. The handshakes are performed in memory, measuring only the TLS work.
+
+Run from the application directory:
+
+    python script/benchmark/tlsHandshake.py [--seconds 3] [--tls12]
+"""
+# adding the application directory to the include path
+import sys
+sys.path.append(".")
+
+import os
+import argparse
+import datetime
+import tempfile
+from time import perf_counter
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from OpenSSL import SSL
+
+from application.interface.http.tls import ReloadableCertificateOptions
+
+
+def createCertificate(directoryPath):
+    privateKey = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = x509.CertificateBuilder() \
+        .subject_name(subject) \
+        .issuer_name(subject) \
+        .public_key(privateKey.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now) \
+        .not_valid_after(now + datetime.timedelta(days=1)) \
+        .sign(privateKey, hashes.SHA256())
+
+    certificatePath = os.path.join(directoryPath, "certificate.pem")
+    with open(certificatePath, "wb") as certificateFile:
+        certificateFile.write(certificate.public_bytes(serialization.Encoding.PEM))
+
+    privateKeyPath = os.path.join(directoryPath, "privateKey.pem")
+    with open(privateKeyPath, "wb") as privateKeyFile:
+        privateKeyFile.write(privateKey.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+
+    return certificatePath, privateKeyPath
+
+
+def pump(source, destination):
+    try:
+        data = source.bio_read(65536)
+    except SSL.WantReadError:
+        return False
+
+    destination.bio_write(data)
+    return True
+
+
+def handshake(serverContext, clientContext, session):
+    server = SSL.Connection(serverContext, None)
+    server.set_accept_state()
+    client = SSL.Connection(clientContext, None)
+    client.set_connect_state()
+    if session is not None:
+        client.set_session(session)
+
+    for connection in (client, server, client, server, client):
+        try:
+            connection.do_handshake()
+        except SSL.WantReadError:
+            pass
+        pump(client, server)
+        pump(server, client)
+
+    # TLS 1.3 session tickets are sent after the handshake
+    try:
+        client.recv(1)
+    except SSL.WantReadError:
+        pass
+
+    # pyOpenSSL does not expose SSL_session_reused()
+    reused = SSL._lib.SSL_session_reused(client._ssl) == 1
+    session = client.get_session()
+
+    # OpenSSL evicts sessions of connections which were not shut down cleanly
+    client.shutdown()
+    pump(client, server)
+    server.shutdown()
+
+    return reused, session
+
+
+def run(tlsConfig, clientContext, seconds, resume):
+    serverContext = ReloadableCertificateOptions(tlsConfig).getContext()
+
+    count = 0
+    reusedCount = 0
+    session = None
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        reused, newSession = handshake(serverContext, clientContext, session)
+        count += 1
+        reusedCount += 1 if reused else 0
+        if resume:
+            session = newSession
+
+    return count / seconds, reusedCount / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TLS handshake benchmark")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--tls12", action="store_true", help="limit the client to TLS 1.2")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directoryPath:
+        certificatePath, privateKeyPath = createCertificate(directoryPath)
+
+        tlsConfig = {
+            "certificatePath": certificatePath,
+            "privateKeyPath": privateKeyPath,
+            "privateKeyPassphrase": "",
+            "certificateChainPaths": [],
+            "sessionCache": True,
+            "sessionTimeout": 300,
+            "sessionTickets": True,
+            "ciphers": "ECDHE+AESGCM:ECDHE+CHACHA20",
+            "curve": "",
+            "minimumVersion": "TLSv1_2"
+        }
+
+        clientContext = SSL.Context(SSL.TLS_METHOD)
+        clientContext.set_session_cache_mode(SSL.SESS_CACHE_CLIENT)
+        if arguments.tls12:
+            clientContext.set_max_proto_version(SSL.TLS1_2_VERSION)
+
+        fullRate, _ = run(dict(tlsConfig, sessionCache=False, sessionTickets=False), clientContext,
+                          arguments.seconds, False)
+        print("full handshakes:          {:8.1f} handshakes/s".format(fullRate))
+
+        for sessionCache, sessionTickets, name in ((True, False, "session cache"), (False, True, "session tickets")):
+            rate, reused = run(dict(tlsConfig, sessionCache=sessionCache, sessionTickets=sessionTickets),
+                               clientContext, arguments.seconds, True)
+            print("resumed ({}): {:8.1f} handshakes/s, {:.0%} resumed, {:.2f}x".format(
+                name.ljust(15), rate, reused, rate / fullRate
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Traffic replay
+
+Replays the requests captured by the HTTP interface (interface.http.capture) against a running instance, at their
+original pace or at a scaled rate, and compares the latency distributions measured for two builds.
+
+Replaying a capture, signing the requests if the instance requires authentication:
+
+    python script/replay/replay.py run log/capture.log [log/capture.log.1 ...] --url http://127.0.0.1:8000 \
+        [--rate 1.0] [--concurrency 4] [--key <authentication key>] [--limit 0] --output build-a.json
+
+--rate 2 replays twice as fast as captured, --rate 0 sends the requests as fast as the concurrency allows. Each
+concurrent request uses its own connection, the concurrency must not exceed interface.http.connection.maximumByPeer
+of the instance. The latencies, the requests whose response code differs from the captured one and the delay of the
+requests behind their schedule, when the replay could not keep the pace, are reported by method.
+
+Comparing two replays, exiting with status 1 if a percentile of a method regressed by more than the threshold:
+
+    python script/replay/replay.py compare build-a.json build-b.json [--threshold 10] [--minimumCount 20]
+"""
+import sys
+import json
+import hmac
+import hashlib
+import argparse
+import threading
+import http.client
+import urllib.parse
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter, sleep, time
+
+import msgpack
+
+kPercentiles = (50, 90, 99)
+
+
+def loadRequests(capturePaths, limit):
+    """
+    Load the captured requests, ordered by arrival time.
+
+    :param capturePaths: <list> capture files
+    :param limit: <int> maximum number of requests, 0 for all
+    :return: <list> request records with their arrival time as a timestamp
+    """
+    requests = []
+    for capturePath in capturePaths:
+        with open(capturePath) as captureFile:
+            for line in captureFile:
+                record = json.loads(line)
+                if record.get("type") != "request":
+                    continue
+
+                record["time"] = datetime.fromisoformat(record["time"]).timestamp()
+                requests.append(record)
+
+    requests.sort(key=lambda record: record["time"])
+    if limit > 0:
+        requests = requests[:limit]
+
+    return requests
+
+
+def getPercentile(sortedValues, percentile):
+    if len(sortedValues) == 0:
+        return 0
+
+    index = max(int(round(percentile / 100 * len(sortedValues))) - 1, 0)
+    return sortedValues[min(index, len(sortedValues) - 1)]
+
+
+class Replay:
+    """
+    Replay of captured requests, each worker thread keeping its own keep-alive connection.
+    """
+
+    def __init__(self, url, concurrency, key):
+        """
+        :param url: <str> instance URL
+        :param concurrency: <int> maximum number of requests in flight
+        :param key: <str> HMAC authentication key, None if the instance does not authenticate requests
+        """
+        url = urllib.parse.urlsplit(url)
+        self.connectionClass = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.host = url.netloc
+        self.concurrency = concurrency
+        self.key = key
+
+        self.results = {}
+        self._resultsLock = threading.Lock()
+        self._local = threading.local()
+
+    def _getConnection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self.connectionClass(self.host, timeout=30)
+
+        return connection
+
+    def _getRequestPath(self, record):
+        if record["method"] == "batch":
+            path = "/batch"
+        else:
+            path = "/{}/{}".format(record["version"], record["method"])
+
+        parametersString = json.dumps(record["parameters"], separators=(",", ":"))
+        query = {"parameters": parametersString}
+
+        if self.key is not None:
+            signatureTime = str(timegm(datetime.utcnow().utctimetuple()))
+            query["time"] = signatureTime
+            query["signature"] = hmac.new(
+                self.key.encode(),
+                "{}|{}".format(parametersString, signatureTime).encode(),
+                digestmod=hashlib.sha512
+            ).hexdigest()
+
+        return "{}?{}".format(path, urllib.parse.urlencode(query))
+
+    def _send(self, record, scheduledTime):
+        path = self._getRequestPath(record)
+        headers = {"Accept": "application/msgpack" if record.get("encoding") == "msgpack" else "application/json"}
+
+        sendTime = perf_counter()
+        lag = max(sendTime - scheduledTime, 0)
+
+        code = None
+        try:
+            connection = self._getConnection()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # the instance closed the idle keep-alive connection
+                connection.close()
+                sendTime = perf_counter()
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+
+            body = response.read()
+            latency = perf_counter() - sendTime
+
+            if response.status == 200:
+                if response.getheader("Content-Type") == "application/msgpack":
+                    code = msgpack.unpackb(body)["code"]
+                else:
+                    code = json.loads(body)["code"]
+            elif response.status == 304:
+                code = 304
+        except Exception:
+            # the connection may not have been created, a new one is opened by the next request otherwise
+            connection = getattr(self._local, "connection", None)
+            if connection is not None:
+                connection.close()
+                self._local.connection = None
+
+            latency = perf_counter() - sendTime
+
+        with self._resultsLock:
+            result = self.results.setdefault(record["method"], {
+                "latencies": [],
+                "lags": [],
+                "errors": 0,
+                "codeMismatches": 0
+            })
+            result["latencies"].append(latency)
+            result["lags"].append(lag)
+            if code is None:
+                result["errors"] += 1
+            elif code != record.get("code"):
+                result["codeMismatches"] += 1
+
+    def run(self, requests, rate):
+        """
+        Send the requests, following their captured pace scaled by the rate.
+
+        :param requests: <list> request records ordered by arrival time
+        :param rate: <float> pace multiplier, 0 to send the requests without waiting
+        :return: <float> replay duration
+        :raise RuntimeError: if requests could not be replayed
+        """
+        if len(requests) == 0:
+            return 0
+
+        firstTime = requests[0]["time"]
+        start = perf_counter()
+
+        # exceptions raised by the workers, which the executor would otherwise discard
+        failures = []
+
+        def collectFailure(future):
+            if future.exception() is not None:
+                failures.append(future.exception())
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for record in requests:
+                scheduledTime = start
+                if rate > 0:
+                    scheduledTime += (record["time"] - firstTime) / rate
+                    delay = scheduledTime - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+
+                executor.submit(self._send, record, scheduledTime).add_done_callback(collectFailure)
+
+        if len(failures) > 0:
+            raise RuntimeError("{} requests could not be replayed".format(len(failures))) from failures[0]
+
+        return perf_counter() - start
+
+
+def summarize(results):
+    """
+    Compute the latency percentiles, in milliseconds, by method and for all methods.
+
+    :param results: <dict> replay results by method
+    :return: <dict>
+    """
+    summaries = {}
+    allLatencies = []
+    for method, result in results.items():
+        latencies = sorted(result["latencies"])
+        allLatencies.extend(latencies)
+
+        summaries[method] = {
+            "count": len(latencies),
+            "errors": result["errors"],
+            "codeMismatches": result["codeMismatches"],
+            "lag": max(result["lags"], default=0) * 1000,
+            "percentiles": {str(percentile): getPercentile(latencies, percentile) * 1000 for percentile in kPercentiles}
+        }
+
+    allLatencies.sort()
+    summaries["*"] = {
+        "count": len(allLatencies),
+        "errors": sum(summary["errors"] for summary in summaries.values()),
+        "codeMismatches": sum(summary["codeMismatches"] for summary in summaries.values()),
+        "lag": max((summary["lag"] for summary in summaries.values()), default=0),
+        "percentiles": {str(percentile): getPercentile(allLatencies, percentile) * 1000 for percentile in kPercentiles}
+    }
+
+    return summaries
+
+
+def printSummaries(summaries):
+    print("{} {:>8} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "method".ljust(32), "count", "errors", "mismatches", "p50 (ms)", "p90 (ms)", "p99 (ms)", "lag (ms)"
+    ))
+    for method in sorted(summaries):
+        summary = summaries[method]
+        print("{} {:8d} {:8d} {:10d} {:10.2f} {:10.2f} {:10.2f} {:10.2f}".format(
+            method.ljust(32),
+            summary["count"],
+            summary["errors"],
+            summary["codeMismatches"],
+            summary["percentiles"]["50"],
+            summary["percentiles"]["90"],
+            summary["percentiles"]["99"],
+            summary["lag"]
+        ))
+
+
+def runCommand(arguments):
+    requests = loadRequests(arguments.capture, arguments.limit)
+    print("Replaying {} requests against {}".format(len(requests), arguments.url))
+
+    replay = Replay(arguments.url, arguments.concurrency, arguments.key)
+    duration = replay.run(requests, arguments.rate)
+    summaries = summarize(replay.results)
+
+    printSummaries(summaries)
+    print("Completed in {:.2f} s".format(duration))
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as outputFile:
+            json.dump({
+                "url": arguments.url,
+                "rate": arguments.rate,
+                "concurrency": arguments.concurrency,
+                "time": time(),
+                "duration": duration,
+                "methods": summaries
+            }, outputFile, indent=2, sort_keys=True)
+
+    return 0
+
+
+def compareCommand(arguments):
+    with open(arguments.baseline) as baselineFile:
+        baseline = json.load(baselineFile)["methods"]
+    with open(arguments.candidate) as candidateFile:
+        candidate = json.load(candidateFile)["methods"]
+
+    print("{} {:>6} {:>10} {:>10} {:>8}".format("method".ljust(40), "", "baseline", "candidate", "drift"))
+
+    regressed = False
+    for method in sorted(set(baseline) | set(candidate)):
+        if method not in baseline or method not in candidate:
+            print("{} only replayed by the {}".format(method.ljust(40), "candidate" if method in candidate else
+                                                      "baseline"))
+            continue
+
+        comparable = baseline[method]["count"] >= arguments.minimumCount \
+            and candidate[method]["count"] >= arguments.minimumCount
+
+        for percentile in kPercentiles:
+            baselineLatency = baseline[method]["percentiles"][str(percentile)]
+            candidateLatency = candidate[method]["percentiles"][str(percentile)]
+            drift = (candidateLatency - baselineLatency) / baselineLatency * 100 if baselineLatency > 0 else 0
+
+            flag = ""
+            if comparable and drift > arguments.threshold:
+                flag = "  regression"
+                regressed = True
+
+            print("{} {:>6} {:10.2f} {:10.2f} {:+7.1f}%{}".format(
+                (method if percentile == kPercentiles[0] else "").ljust(40),
+                "p{}".format(percentile),
+                baselineLatency,
+                candidateLatency,
+                drift,
+                flag
+            ))
+
+        errors = (baseline[method]["errors"] + baseline[method]["codeMismatches"],
+                  candidate[method]["errors"] + candidate[method]["codeMismatches"])
+        if errors != (0, 0):
+            print("{} {:>6} {:10d} {:10d}".format("".ljust(40), "errors", *errors))
+
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traffic replay")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="replay captured requests")
+    runParser.add_argument("capture", nargs="+", help="capture files")
+    runParser.add_argument("--url", default="http://127.0.0.1:8000")
+    runParser.add_argument("--rate", type=float, default=1.0)
+    runParser.add_argument("--concurrency", type=int, default=4)
+    runParser.add_argument("--key", default=None, help="authentication key used to sign the requests")
+    runParser.add_argument("--limit", type=int, default=0, help="maximum number of requests replayed")
+    runParser.add_argument("--output", default=None, help="file the results are written to")
+
+    compareParser = commands.add_parser("compare", help="compare the results of two replays")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("candidate")
+    compareParser.add_argument("--threshold", type=float, default=10, help="regression threshold, in percent")
+    compareParser.add_argument("--minimumCount", type=int, default=20,
+                               help="minimum number of requests of a method to detect its regressions")
+
+    arguments = parser.parse_args()
+    if arguments.command == "run":
+        return runCommand(arguments)
+
+    return compareCommand(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
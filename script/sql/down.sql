@@ -0,0 +1 @@
+ALTER TABLE `article_article` DROP INDEX `title_fulltext`;
@@ -0,0 +1,5 @@
+--
+-- Full-text index of article titles, used by default.article.search (InnoDB, MySQL 5.6 or later)
+--
+
+ALTER TABLE `article_article` ADD FULLTEXT INDEX `title_fulltext` (`title`);